@@ -0,0 +1,77 @@
+import argparse
+import asyncio
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+
+from item_store import ItemStore
+
+
+def compacted_copy(source: Path, target: Path) -> int:
+    with sqlite3.connect(source) as database:
+        database.execute("VACUUM INTO ?", (str(target),))
+    database.close()
+    return target.stat().st_size
+
+
+def table_bytes(path: Path) -> dict[str, int]:
+    with sqlite3.connect(path) as database:
+        try:
+            sizes = dict(
+                database.execute(
+                    """
+                    SELECT name, SUM(pgsize) FROM dbstat
+                    WHERE name IN (SELECT name FROM sqlite_master WHERE type = 'table')
+                    GROUP BY name
+                    """
+                )
+            )
+        except sqlite3.OperationalError:
+            # dbstat is an optional compile-time extension.
+            sizes = {}
+    database.close()
+    return sizes
+
+
+async def open_store(path: Path) -> None:
+    # Opening the store migrates the file to the current schema and compresses its article content.
+    async with ItemStore(path):
+        pass
+
+
+def mib(size: int) -> str:
+    return f"{size / 1024 / 1024:.1f} MiB"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Report how much ItemStore content compression shrinks a cache file.")
+    parser.add_argument("database", type=Path, nargs="?", default=Path("cache/social.sqlite"))
+    args = parser.parse_args()
+    if not args.database.exists():
+        parser.error(f"{args.database} does not exist; run make download_db first")
+
+    with tempfile.TemporaryDirectory() as workdir:
+        # Both sides are measured as VACUUMed copies, so free pages in the original do not count as savings.
+        baseline = Path(workdir) / "baseline.sqlite"
+        before_size = compacted_copy(args.database, baseline)
+        before = table_bytes(baseline)
+
+        started = time.perf_counter()
+        asyncio.run(open_store(baseline))
+        elapsed = time.perf_counter() - started
+        after_size = compacted_copy(baseline, Path(workdir) / "compressed.sqlite")
+        after = table_bytes(Path(workdir) / "compressed.sqlite")
+
+    print(
+        f"file: {mib(before_size)} -> {mib(after_size)} ({1 - after_size / before_size:.0%} smaller), "
+        f"migrated in {elapsed:.1f}s"
+    )
+    if not after:
+        print("dbstat is unavailable in this SQLite build; only whole-file sizes are reported")
+    for table in sorted(before.keys() | after.keys()):
+        print(f"{table:>20}: {mib(before.get(table, 0))} -> {mib(after.get(table, 0))}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+import argparse
+import statistics
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+import trafilatura
+from bs4 import BeautifulSoup
+from content_fetcher import Document, FetchResult, extract_with_trafilatura
+
+
+def extract_with_three_parses(document: Document) -> FetchResult:
+    # The previous extractor: text and HTML extracted separately, then the HTML reparsed to drop <body>.
+    text = trafilatura.extract(document.content, url=document.url, include_comments=False)
+    if not text:
+        return None, None
+
+    html = trafilatura.extract(document.content, url=document.url, include_comments=False, output_format="html")
+    if html and ("<html" in html or "<body" in html):
+        soup = BeautifulSoup(html, "html.parser")
+        container = soup.find("body") or soup
+        html = "".join(str(tag) for tag in container.children)
+    return text, html
+
+
+def load_corpus(corpus: Path) -> list[Document]:
+    pages = sorted(path for path in corpus.rglob("*") if path.suffix in {".html", ".htm"})
+    return [
+        Document(url=path.resolve().as_uri(), status_code=200, headers={}, content=path.read_bytes()) for path in pages
+    ]
+
+
+def per_page_seconds(extract: Callable[[Document], FetchResult], documents: list[Document], rounds: int) -> list[float]:
+    timings: list[float] = []
+    for document in documents:
+        samples: list[float] = []
+        for _ in range(rounds):
+            started = time.process_time()
+            extract(document)
+            samples.append(time.process_time() - started)
+        timings.append(min(samples))
+    return timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare per-page CPU time of article extractors on saved pages.")
+    parser.add_argument("corpus", type=Path, help="directory of saved .html pages")
+    parser.add_argument("--rounds", type=int, default=3, help="repetitions per page; the fastest one is kept")
+    args = parser.parse_args()
+
+    documents = load_corpus(args.corpus)
+    if not documents:
+        parser.error(f"no .html pages found under {args.corpus}")
+
+    baseline = per_page_seconds(extract_with_three_parses, documents, args.rounds)
+    current = per_page_seconds(extract_with_trafilatura, documents, args.rounds)
+    extracted = sum(1 for document in documents if extract_with_trafilatura(document)[0])
+
+    print(f"pages: {len(documents)} ({extracted} with extracted text)")
+    for name, timings in (("three parses", baseline), ("single pass", current)):
+        print(
+            f"{name:>12}: total {sum(timings):.3f}s, "
+            f"median {statistics.median(timings) * 1000:.1f}ms/page, "
+            f"max {max(timings) * 1000:.1f}ms/page"
+        )
+    print(f"CPU saving: {1 - sum(current) / sum(baseline):.0%}")
+
+
+if __name__ == "__main__":
+    main()
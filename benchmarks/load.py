@@ -0,0 +1,217 @@
+import argparse
+import asyncio
+import random
+import resource
+import sys
+import tempfile
+import threading
+import time
+from datetime import UTC, datetime
+from functools import partial
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from types import SimpleNamespace
+
+from content_fetcher import ContentFetcher
+from crawlers.hn import HackerNewsCrawler
+from item_store import ItemStore
+from loguru import logger
+from main import StageTimer, run_pipeline
+from models import Comment, Perspective, Viewpoint
+
+
+def synthetic_pages(count: int) -> list[bytes]:
+    return [
+        (
+            f"<html><head><title>Article {index}</title></head><body><nav>Home | About</nav><article>"
+            f"<h1>Article {index}</h1>"
+            + "".join(
+                f"<p>Paragraph {paragraph} of article {index} carries enough prose to look like a real story.</p>"
+                for paragraph in range(30)
+            )
+            + "</article><footer>Copyright</footer></body></html>"
+        ).encode()
+        for index in range(count)
+    ]
+
+
+def load_pages(corpus: Path | None) -> list[bytes]:
+    if corpus is None:
+        return synthetic_pages(20)
+    pages = [path.read_bytes() for path in sorted(corpus.rglob("*")) if path.suffix in {".html", ".htm"}]
+    if not pages:
+        raise SystemExit(f"no .html pages found under {corpus}")
+    return pages
+
+
+class ArticleServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, pages: list[bytes], *, latency: float, error_rate: float, body_bytes: int) -> None:
+        super().__init__(("127.0.0.1", 0), ArticleHandler)
+        self.pages = pages
+        self.latency = latency
+        self.error_rate = error_rate
+        self.body_bytes = body_bytes
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+class ArticleHandler(BaseHTTPRequestHandler):
+    server: ArticleServer
+
+    def do_GET(self) -> None:
+        time.sleep(self.server.latency)
+        if self.path.startswith("/jina/"):
+            self._reply(200, "text/plain", f"Reader view of {self.path.removeprefix('/jina/')}".encode())
+            return
+
+        index = int(self.path.rsplit("/", 1)[-1])
+        # Seeded per article so every run fails the same URLs.
+        if random.Random(index).random() < self.server.error_rate:
+            self._reply(500, "text/plain", b"injected failure")
+            return
+        page = self.server.pages[index % len(self.server.pages)]
+        if len(page) < self.server.body_bytes:
+            page += b"<!--" + b"x" * (self.server.body_bytes - len(page)) + b"-->"
+        self._reply(200, "text/html; charset=utf-8", page)
+
+    def _reply(self, status: int, content_type: str, body: bytes) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: object) -> None:
+        return None
+
+
+class FakeHackerNewsClient:
+    # Also stands in as the crawler's client_factory, which passes cache_db_path.
+    def __init__(self, stories: list[SimpleNamespace], **_: object) -> None:
+        self._stories = stories
+
+    async def __aenter__(self) -> "FakeHackerNewsClient":
+        return self
+
+    async def __aexit__(self, *_: object) -> None:
+        return None
+
+    async def fetch_top_stories(self, *, top_n: int, fetch_comment_levels_count: int) -> SimpleNamespace:
+        return SimpleNamespace(stories=self._stories[:top_n])
+
+
+def stories(base_url: str, *, count: int, comments: int, run: int) -> list[SimpleNamespace]:
+    published_at = datetime(2026, 7, 16, tzinfo=UTC)
+    # Each run keeps the same front page and adds comments, as consecutive scheduled runs do.
+    comment_count = comments + run * max(1, comments // 2)
+    return [
+        SimpleNamespace(
+            id=index,
+            title=f"Load-test story {index}",
+            url=f"{base_url}/articles/{index}",
+            time=published_at,
+            comments=[
+                SimpleNamespace(by=f"reader-{comment}", text=f"Comment {comment} on story {index}. " * 8)
+                for comment in range(comment_count)
+            ],
+        )
+        for index in range(count)
+    ]
+
+
+class FakePerspectiveGenerator:
+    def __init__(self, latency: float) -> None:
+        self._latency = latency
+
+    async def generate(self, title: str, comments: list[Comment]) -> Perspective:
+        await asyncio.sleep(self._latency)
+        return Perspective(
+            title=f"Perspective on {title}",
+            summary=f"Load-test analysis of {len(comments)} comments.",
+            sentiment="mixed",
+            viewpoints=[Viewpoint(statement="Generated by the load-test harness", support_percentage=100)],
+        )
+
+
+def peak_rss_mib() -> float:
+    # ru_maxrss is reported in KiB on Linux; children covers extraction worker processes.
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return max(own, children) / 1024
+
+
+async def run_load_test(args: argparse.Namespace, server: ArticleServer, workdir: Path) -> None:
+    generator = FakePerspectiveGenerator(args.llm_latency_ms / 1000) if args.llm else None
+
+    print(f"{args.stories} stories x {args.comments}+ comments, {len(server.pages)} corpus pages")
+    async with ItemStore(workdir / "social.sqlite") as store:
+        for run in range(args.runs):
+            fetcher = ContentFetcher(
+                jina_base_url=f"{server.base_url}/jina/",
+                extraction_workers=args.extraction_workers,
+            )
+            source_stories = stories(server.base_url, count=args.stories, comments=args.comments, run=run)
+            crawler = HackerNewsCrawler(
+                content_fetcher=fetcher,
+                client_factory=partial(FakeHackerNewsClient, source_stories),
+                fetch_concurrency=args.fetch_concurrency,
+            )
+            timer = StageTimer()
+            started = time.perf_counter()
+            items = await run_pipeline(
+                store=store,
+                crawler=crawler,
+                count=args.stories,
+                output_dir=workdir / "output",
+                enable_llm=args.llm,
+                perspective_generator=generator,
+                timer=timer,
+            )
+            elapsed = time.perf_counter() - started
+
+            stages = ", ".join(f"{name} {seconds * 1000:.0f}ms" for name, seconds in timer.seconds.items())
+            print(
+                f"run {run + 1}: {len(items) / elapsed:.1f} Items/s ({elapsed:.2f}s), "
+                f"peak RSS {peak_rss_mib():.0f} MiB\n  {stages}"
+            )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the full pipeline offline against local stand-in services.")
+    parser.add_argument("--stories", type=int, default=100, help="stories on the fake front page")
+    parser.add_argument("--comments", type=int, default=20, help="comments per story on the first run")
+    parser.add_argument("--runs", type=int, default=2, help="consecutive runs against the same ItemStore")
+    parser.add_argument("--corpus", type=Path, help="directory of recorded .html pages; synthetic pages if omitted")
+    parser.add_argument("--latency-ms", type=float, default=50, help="article and Jina response latency")
+    parser.add_argument("--error-rate", type=float, default=0.1, help="fraction of articles that return HTTP 500")
+    parser.add_argument("--body-kb", type=int, default=0, help="pad article bodies to at least this size")
+    parser.add_argument("--fetch-concurrency", type=int, default=8)
+    parser.add_argument("--extraction-workers", type=int, help="use a process pool for extraction")
+    parser.add_argument("--llm", action="store_true", help="run the transform stage with a fake generator")
+    parser.add_argument("--llm-latency-ms", type=float, default=500, help="simulated generation latency")
+    args = parser.parse_args()
+
+    logger.remove()
+    logger.add(sys.stderr, level="ERROR")
+
+    server = ArticleServer(
+        load_pages(args.corpus),
+        latency=args.latency_ms / 1000,
+        error_rate=args.error_rate,
+        body_bytes=args.body_kb * 1024,
+    )
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            asyncio.run(run_load_test(args, server, Path(workdir)))
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
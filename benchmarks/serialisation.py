@@ -0,0 +1,90 @@
+import argparse
+import json
+import time
+from collections.abc import Callable
+from datetime import UTC, datetime, timedelta
+
+from json_codec import EXPORT_INDENT, decode_items, encode_items
+from models import Comment, Item, Perspective, Viewpoint
+
+
+def synthetic_items(count: int, *, comments: int) -> list[Item]:
+    now = datetime(2026, 7, 17, tzinfo=UTC)
+    return [
+        Item(
+            id=str(index),
+            title=f"Benchmark story {index}",
+            url=f"https://news.example/item?id={index}",
+            original_url=f"https://example.test/articles/{index}",
+            content=f"Article body {index}. " * 200,
+            content_html=f"<p>Article body {index}.</p>" * 200,
+            comments=[
+                Comment(author=f"reader-{comment}", content=f"Comment {comment} on story {index}. " * 8)
+                for comment in range(comments)
+            ],
+            published_at=now - timedelta(hours=index % 48),
+            created_at=now - timedelta(days=1),
+            updated_at=now,
+            generated_at_comment_count=comments,
+            ai_perspective=Perspective(
+                title=f"Perspective on story {index}",
+                summary="Readers weigh the trade-offs of the change. " * 4,
+                sentiment="mixed",
+                viewpoints=[
+                    Viewpoint(statement=f"Viewpoint {viewpoint}", support_percentage=25) for viewpoint in range(4)
+                ],
+            ),
+        )
+        for index in range(count)
+    ]
+
+
+def best_of(rounds: int, operation: Callable[[], object]) -> float:
+    samples: list[float] = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        operation()
+        samples.append(time.perf_counter() - started)
+    return min(samples)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare Item encode and decode through the general and codec paths.")
+    parser.add_argument("--items", type=int, default=10_000, help="Items encoded and decoded")
+    parser.add_argument("--comments", type=int, default=40, help="comments per Item")
+    parser.add_argument("--rounds", type=int, default=3, help="best of this many rounds is reported")
+    args = parser.parse_args()
+
+    items = synthetic_items(args.items, comments=args.comments)
+    payloads = [item.model_dump_json() for item in items]
+    exported = encode_items(items, indent=EXPORT_INDENT)
+    # Both paths must produce the same export, or the comparison is meaningless.
+    if json.dumps([item.model_dump(mode="json") for item in items], indent=2, ensure_ascii=False).encode() != exported:
+        raise SystemExit("codec export differs from json.dump output")
+
+    results = {
+        "export": (
+            best_of(
+                args.rounds,
+                lambda: json.dumps(
+                    [item.model_dump(mode="json") for item in items], indent=2, ensure_ascii=False
+                ).encode(),
+            ),
+            best_of(args.rounds, lambda: encode_items(items, indent=EXPORT_INDENT)),
+        ),
+        "decode": (
+            best_of(args.rounds, lambda: [Item.model_validate_json(payload) for payload in payloads]),
+            best_of(args.rounds, lambda: decode_items(exported)),
+        ),
+    }
+
+    print(f"{args.items} Items x {args.comments} comments, {len(exported) / 1024 / 1024:.1f} MiB exported")
+    for stage, (general, codec) in results.items():
+        print(
+            f"{stage:>8}: general {general * 1000:.0f}ms, codec {codec * 1000:.0f}ms "
+            f"({general / codec:.1f}x, {codec / args.items * 1_000_000:.1f}µs/Item)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+import argparse
+import asyncio
+import tempfile
+import time
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+
+import aiosqlite
+from item_store import ItemStore
+from models import Comment, Item
+
+LEGACY_TABLE_NAME = "item"
+LEGACY_CREATE_TABLE_SQL = f"""
+CREATE TABLE IF NOT EXISTS {LEGACY_TABLE_NAME} (
+    id TEXT PRIMARY KEY,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    payload TEXT NOT NULL
+)
+"""
+
+
+class ConnectionPerCallStore:
+    # The previous ItemStore: one JSON payload per Item, a connection per call and a commit per save.
+    def __init__(self, path: Path) -> None:
+        self.path = path
+
+    async def init(self) -> None:
+        async with aiosqlite.connect(self.path) as database:
+            await database.execute(LEGACY_CREATE_TABLE_SQL)
+            await database.commit()
+
+    async def save(self, item: Item) -> None:
+        async with aiosqlite.connect(self.path) as database:
+            await database.execute(
+                f"""
+                INSERT INTO {LEGACY_TABLE_NAME} (id, created_at, updated_at, payload)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(id) DO UPDATE SET updated_at = excluded.updated_at, payload = excluded.payload
+                """,
+                (item.id, item.created_at.isoformat(), item.updated_at.isoformat(), item.model_dump_json()),
+            )
+            await database.commit()
+
+    async def reconcile(self, now: datetime, fetched: list[Item]) -> list[Item]:
+        reconciled: list[Item] = []
+        for fresh_item in fetched:
+            async with aiosqlite.connect(self.path) as database:
+                cursor = await database.execute(
+                    f"SELECT payload FROM {LEGACY_TABLE_NAME} WHERE id = ?",
+                    (fresh_item.id,),
+                )
+                row = await cursor.fetchone()
+            if row is None:
+                reconciled.append(fresh_item)
+                continue
+            cached_item = Item.model_validate_json(row[0])
+            reconciled.append(cached_item.model_copy(update={"comments": fresh_item.comments, "updated_at": now}))
+        return reconciled
+
+
+def synthetic_items(count: int, *, comments: int) -> list[Item]:
+    now = datetime(2026, 7, 17, tzinfo=UTC)
+    return [
+        Item(
+            id=str(index),
+            title=f"Benchmark story {index}",
+            url=f"https://example.test/articles/{index}",
+            content=f"Article body {index}. " * 200,
+            content_html=f"<p>Article body {index}.</p>" * 200,
+            comments=[
+                Comment(author=f"reader-{comment}", content=f"Comment {comment}. " * 8) for comment in range(comments)
+            ],
+            created_at=now - timedelta(days=1),
+            updated_at=now,
+        )
+        for index in range(count)
+    ]
+
+
+async def save(store: ItemStore | ConnectionPerCallStore, items: list[Item]) -> None:
+    if isinstance(store, ItemStore):
+        await store.save_many(items)
+    else:
+        for item in items:
+            await store.save(item)
+
+
+async def measure(store: ItemStore | ConnectionPerCallStore, items: list[Item]) -> dict[str, float]:
+    timings: dict[str, float] = {}
+    started = time.perf_counter()
+    await save(store, items)
+    timings["save"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    reconciled = await store.reconcile(datetime.now(UTC), items)
+    timings["reconcile"] = time.perf_counter() - started
+
+    # The next scheduled run: same articles and Perspectives, one more comment each.
+    for item in reconciled:
+        item.comments.append(Comment(author="late-reader", content="Another comment."))
+    started = time.perf_counter()
+    await save(store, reconciled)
+    timings["re-save"] = time.perf_counter() - started
+    return timings
+
+
+async def reconcile_seconds(store: ItemStore | ConnectionPerCallStore, items: list[Item], rounds: int = 5) -> float:
+    samples: list[float] = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        await store.reconcile(datetime.now(UTC), items)
+        samples.append(time.perf_counter() - started)
+    return min(samples)
+
+
+async def run(items: list[Item], workdir: Path, crawl_sizes: list[int]) -> None:
+    legacy = ConnectionPerCallStore(workdir / "legacy.sqlite")
+    await legacy.init()
+    results = {"connection per call": await measure(legacy, items)}
+    scaling = {"connection per call": [await reconcile_seconds(legacy, items[:size]) for size in crawl_sizes]}
+    async with ItemStore(workdir / "current.sqlite") as store:
+        results["current"] = await measure(store, items)
+        scaling["current"] = [await reconcile_seconds(store, items[:size]) for size in crawl_sizes]
+
+    for name, timings in results.items():
+        print(
+            f"{name:>20}: "
+            + ", ".join(f"{stage} {seconds / len(items) * 1_000_000:.0f}µs/Item" for stage, seconds in timings.items())
+        )
+    baseline, current = (sum(timings.values()) for timings in results.values())
+    print(f"speedup: {baseline / current:.1f}x")
+
+    print("reconcile per crawl:")
+    for name, timings in scaling.items():
+        print(
+            f"{name:>20}: "
+            + ", ".join(
+                f"{size} Items {seconds * 1000:.1f}ms ({seconds / size * 1_000_000:.0f}µs/Item)"
+                for size, seconds in zip(crawl_sizes, timings, strict=True)
+            )
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare per-Item ItemStore overhead across connection strategies.")
+    parser.add_argument("--items", type=int, default=3000, help="Items saved and then reconciled")
+    parser.add_argument("--comments", type=int, default=20, help="comments per Item")
+    parser.add_argument(
+        "--crawl-sizes",
+        type=int,
+        nargs="+",
+        default=[30, 100, 500],
+        help="fetched Items per reconcile",
+    )
+    args = parser.parse_args()
+
+    items = synthetic_items(args.items, comments=args.comments)
+    with tempfile.TemporaryDirectory() as workdir:
+        asyncio.run(run(items, Path(workdir), args.crawl_sizes))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+import zlib
+
+# Values shorter than this stay plain TEXT: zlib's header and checksum would eat most of the saving.
+COMPRESS_MIN_BYTES = 512
+COMPRESSION_LEVEL = 9
+
+# The first byte of every compressed value names its codec, so new codecs or dictionaries can be added later
+# without rewriting stored rows. Never change what an existing marker means.
+ZLIB_CODEC = 1
+ZLIB_HTML_CODEC = 2
+
+# Preset dictionary for extracted article HTML: the markup trafilatura emits plus common English words, most
+# frequent last as zlib prefers. It mostly helps the many short articles, where there is little history to match.
+HTML_ZDICT = (
+    b" the of and to in is that for it with as was on be by this are or from at an which not have has but can will"
+    b" you your we our they their more about also one all would there what when so been if into than out up only"
+    b' <a href="https://</a> <br/> <h4></h4>\n    <h3></h3>\n    <h2></h2>\n    <h1></h1>\n    <table>\n      <tr>'
+    b"\n        <th></th>\n        <td></td>\n      </tr>\n    </table>\n    <ol>\n      <li></li>\n    </ol>"
+    b"\n    <ul>\n      <li></li>\n    </ul>\n    <blockquote></blockquote>\n    <code></code> <em></em> <strong>"
+    b"</strong> <pre></pre>\n    <p></p>\n    <p>"
+)
+
+
+def compress_text(value: str | None, *, html: bool = False) -> str | bytes | None:
+    if value is None:
+        return None
+    encoded = value.encode()
+    if len(encoded) < COMPRESS_MIN_BYTES:
+        return value
+
+    codec = ZLIB_HTML_CODEC if html else ZLIB_CODEC
+    compressor = zlib.compressobj(COMPRESSION_LEVEL, zdict=HTML_ZDICT) if html else zlib.compressobj(COMPRESSION_LEVEL)
+    compressed = bytes([codec]) + compressor.compress(encoded) + compressor.flush()
+    return compressed if len(compressed) < len(encoded) else value
+
+
+def decompress_text(value: str | bytes | None) -> str | None:
+    if value is None or isinstance(value, str):
+        return value
+
+    codec, payload = value[0], value[1:]
+    if codec == ZLIB_CODEC:
+        return zlib.decompress(payload).decode()
+    if codec == ZLIB_HTML_CODEC:
+        decompressor = zlib.decompressobj(zdict=HTML_ZDICT)
+        return (decompressor.decompress(payload) + decompressor.flush()).decode()
+    raise ValueError(f"unknown content codec {codec}")
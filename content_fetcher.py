@@ -1,69 +1,333 @@
 import asyncio
-from collections.abc import Callable
+import multiprocessing
+import time
+from collections.abc import Callable, Mapping
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from types import TracebackType
+from typing import Self
+from urllib.parse import urlsplit
 
-import requests
+import httpx
 import trafilatura
 from bs4 import BeautifulSoup
+from host_health import HostCircuitBreaker, Route, host_of
 from loguru import logger
+from lxml.etree import indent, tostring
+from trafilatura.htmlprocessing import convert_to_html
+from trafilatura.settings import Document as ExtractedDocument
+from trafilatura.utils import normalize_unicode
+from trafilatura.xml import xmltotxt
 
 FetchResult = tuple[str | None, str | None]
-Extractor = Callable[[str], FetchResult]
+# The name of the strategy that produced content, or None when every strategy came back empty.
+Extraction = tuple[str | None, FetchResult]
+
+JINA_STRATEGY = "Jina.ai"
+
+HTML_CONTENT_TYPES = frozenset({"text/html", "application/xhtml+xml", "text/plain"})
+# Non-HTML documents the Jina reader can still turn into text.
+FALLBACK_CONTENT_TYPES = frozenset({"application/pdf"})
+BINARY_SIGNATURES = (
+    (b"%PDF-", "application/pdf"),
+    (b"\x89PNG", "image/png"),
+    (b"GIF8", "image/gif"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"RIFF", "application/riff"),
+    (b"PK\x03\x04", "application/zip"),
+    (b"\x1f\x8b", "application/gzip"),
+    (b"\x1a\x45\xdf\xa3", "video/webm"),
+    (b"ID3", "audio/mpeg"),
+    (b"OggS", "audio/ogg"),
+)
+
+
+class UnsupportedContentError(Exception):
+    def __init__(self, content_type: str) -> None:
+        super().__init__(f"unsupported content type {content_type}")
+        self.content_type = content_type
+        self.fallback = content_type in FALLBACK_CONTENT_TYPES
+
+
+@dataclass(frozen=True, slots=True)
+class Document:
+    url: str
+    status_code: int
+    headers: Mapping[str, str]
+    content: bytes
+    truncated: bool = False
+
+
+@dataclass(slots=True)
+class FetchStats:
+    skipped_urls: list[str] = field(default_factory=list)
+    truncated_urls: list[str] = field(default_factory=list)
+
+
+def sniff_content_type(head: bytes) -> str | None:
+    if head[4:8] == b"ftyp":
+        return "video/mp4"
+    for signature, content_type in BINARY_SIGNATURES:
+        if head.startswith(signature):
+            return content_type
+    return None
+
+
+Extractor = Callable[[Document], FetchResult]
 NamedExtractor = tuple[str, Extractor]
 
 
+def extract_with_trafilatura(document: Document) -> FetchResult:
+    extracted = trafilatura.bare_extraction(document.content, url=document.url, include_comments=False)
+    if not isinstance(extracted, ExtractedDocument) or extracted.body is None:
+        return None, None
+
+    # Both outputs come from one extracted tree; convert_to_html rewrites it in place, so render text first.
+    text = normalize_unicode(xmltotxt(extracted.body, include_formatting=False)).strip()
+    if not text:
+        return None, None
+
+    # One element per line without indentation, and without the <html><body> wrapper, as the extract() path produced.
+    body = convert_to_html(extracted.body).find("body")
+    indent(body, space="")
+    html = "".join(tostring(child, encoding="unicode") for child in body).strip()
+    return text, html
+
+
+def extract_with_beautifulsoup(document: Document) -> FetchResult:
+    soup = BeautifulSoup(document.content, "html.parser")
+    if element := soup.select_one("article, main, div.content"):
+        return element.get_text(), str(element)
+    return None, None
+
+
+def extract_document(extractors: tuple[NamedExtractor, ...], document: Document) -> Extraction:
+    for name, extract in extractors:
+        logger.debug("Extracting {} with {}", document.url, name)
+        text, html = extract(document)
+        if text:
+            return name, (text, html)
+    return None, (None, None)
+
+
 class ContentFetcher:
     def __init__(
         self,
-        timeout: int = 10,
+        timeout: float = 10,
         *,
+        max_connections: int = 64,
+        max_connections_per_host: int = 4,
+        http2: bool = False,
+        transport: httpx.AsyncBaseTransport | None = None,
         extractors: tuple[NamedExtractor, ...] | None = None,
+        extraction_workers: int | None = None,
+        circuit_breaker: HostCircuitBreaker | None = None,
+        deadline: float | None = 30,
+        hedge_after: float | None = None,
+        max_body_bytes: int = 5 * 1024 * 1024,
+        jina_base_url: str = "https://r.jina.ai/",
     ) -> None:
+        if max_connections_per_host < 1:
+            raise ValueError("max_connections_per_host must be at least 1")
+        if extraction_workers is not None and extraction_workers < 1:
+            raise ValueError("extraction_workers must be at least 1")
         self._timeout = timeout
+        self._limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        self._max_connections_per_host = max_connections_per_host
+        self._http2 = http2
+        self._transport = transport
         self._extractors = extractors or (
-            ("trafilatura", self._fetch_with_trafilatura),
-            ("BeautifulSoup", self._fetch_with_beautifulsoup),
-            ("Jina.ai", self._fetch_with_jina),
+            ("trafilatura", extract_with_trafilatura),
+            ("BeautifulSoup", extract_with_beautifulsoup),
         )
+        self._extraction_workers = extraction_workers
+        self._circuit_breaker = circuit_breaker
+        self._deadline = deadline
+        self._hedge_after = hedge_after
+        self._max_body_bytes = max_body_bytes
+        self._jina_base_url = jina_base_url
+        self.stats = FetchStats()
+        self._client: httpx.AsyncClient | None = None
+        self._executor: Executor | None = None
+        self._host_slots: dict[str, asyncio.Semaphore] = {}
 
-    async def fetch(self, url: str) -> FetchResult:
-        return await asyncio.to_thread(self._fetch_sync, url)
-
-    def _fetch_sync(self, url: str) -> FetchResult:
-        for name, extract in self._extractors:
-            try:
-                logger.debug("Fetching {} with {}", url, name)
-                text, html = extract(url)
-                if text:
-                    return text, html
-            except requests.RequestException as error:
-                logger.warning("{} failed for {}: {}", name, url, error)
-        return None, None
+    async def __aenter__(self) -> Self:
+        self._client = httpx.AsyncClient(
+            timeout=self._timeout,
+            limits=self._limits,
+            http2=self._http2,
+            transport=self._transport,
+            follow_redirects=True,
+        )
+        # Extractors run in worker processes so parsing scales past the GIL; None keeps the default thread pool.
+        # Workers come from a forkserver because forking this already multi-threaded process can deadlock them.
+        if self._extraction_workers is not None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self._extraction_workers,
+                mp_context=multiprocessing.get_context("forkserver"),
+            )
+        return self
 
-    def _fetch_with_trafilatura(self, url: str) -> FetchResult:
-        downloaded = trafilatura.fetch_url(url)
-        if not downloaded:
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        client, self._client = self._client, None
+        executor, self._executor = self._executor, None
+        self._host_slots.clear()
+        if executor is not None:
+            # Joining the workers blocks, so it happens off the event loop.
+            await asyncio.to_thread(executor.shutdown, cancel_futures=True)
+        if client is not None:
+            await client.aclose()
+
+    async def fetch(self, url: str) -> FetchResult:
+        try:
+            # A malformed story URL must cost only its own Item, not escape and abort the whole crawl.
+            httpx.URL(url)
+            host_of(url)
+        except (httpx.InvalidURL, ValueError) as error:
+            logger.warning("Skipping malformed URL {!r}: {}", url, error)
             return None, None
 
-        text = trafilatura.extract(downloaded, include_comments=False)
-        if not text:
+        route = self._circuit_breaker.route(url) if self._circuit_breaker else Route.DIRECT
+        if route is Route.SKIP:
+            logger.info("Skipping {}: its host keeps failing", url)
             return None, None
 
-        html = trafilatura.extract(downloaded, include_comments=False, output_format="html")
-        if html and ("<html" in html or "<body" in html):
-            soup = BeautifulSoup(html, "html.parser")
-            container = soup.find("body") or soup
-            html = "".join(str(tag) for tag in container.children)
-        return text, html
+        started = time.monotonic()
+        direct_succeeded = None if route is Route.FALLBACK else False
+        strategy, result = None, (None, None)
+        try:
+            async with asyncio.timeout(self._deadline):
+                if route is Route.FALLBACK:
+                    strategy, result = await self._fetch_fallback(url)
+                else:
+                    try:
+                        direct_succeeded, (strategy, result) = await self._fetch_hedged(url)
+                    except UnsupportedContentError as error:
+                        direct_succeeded = None
+                        self.stats.skipped_urls.append(url)
+                        if error.fallback:
+                            logger.info("Routing {} to {}: {}", url, JINA_STRATEGY, error)
+                            strategy, result = await self._fetch_fallback(url)
+                        else:
+                            logger.info("Skipping {}: {}", url, error)
+        except TimeoutError:
+            logger.warning("Fetching {} exceeded its {}s deadline", url, self._deadline)
 
-    def _fetch_with_beautifulsoup(self, url: str) -> FetchResult:
-        response = requests.get(url, timeout=self._timeout)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.text, "html.parser")
-        if element := soup.select_one("article, main, div.content"):
-            return element.get_text(), str(element)
-        return None, None
+        if self._circuit_breaker:
+            self._circuit_breaker.record(
+                url,
+                direct_succeeded=direct_succeeded,
+                strategy=strategy,
+                seconds=time.monotonic() - started,
+            )
+        return result
+
+    async def _fetch_hedged(self, url: str) -> tuple[bool | None, Extraction]:
+        direct = asyncio.create_task(self._fetch_direct(url))
+        racers = {direct}
+        try:
+            await asyncio.wait(racers, timeout=self._hedge_after)
+            if direct.done():
+                if (extraction := direct.result())[0] is not None:
+                    return True, extraction
+                return False, await self._fetch_fallback(url)
 
-    def _fetch_with_jina(self, url: str) -> FetchResult:
-        response = requests.get(f"https://r.jina.ai/{url}", timeout=self._timeout)
+            # The direct path is slow: race the fallback against it and keep whichever usable result lands first.
+            logger.debug("Hedging {} with {} after {}s", url, JINA_STRATEGY, self._hedge_after)
+            racers.add(asyncio.create_task(self._fetch_fallback(url)))
+            # A direct fetch that was only slower than the hedge, or whose body is not HTML, says nothing of the host.
+            direct_succeeded = None
+            while racers:
+                done, racers = await asyncio.wait(racers, return_when=asyncio.FIRST_COMPLETED)
+                for task in sorted(done, key=lambda task: task is not direct):
+                    try:
+                        extraction = task.result()
+                    except UnsupportedContentError as error:
+                        # The fallback already in flight may still read the document, so it is awaited, not restarted.
+                        logger.info("Awaiting {} for {}: {}", JINA_STRATEGY, url, error)
+                        self.stats.skipped_urls.append(url)
+                        continue
+                    if extraction[0] is not None:
+                        return (True if task is direct else direct_succeeded), extraction
+                    if task is direct:
+                        direct_succeeded = False
+            return direct_succeeded, (None, (None, None))
+        finally:
+            for task in racers:
+                task.cancel()
+
+    async def _fetch_direct(self, url: str) -> Extraction:
+        try:
+            logger.debug("Downloading {}", url)
+            document = await self._download(url)
+        except (httpx.HTTPError, httpx.InvalidURL, ValueError) as error:
+            logger.warning("Download failed for {}: {}", url, error)
+            return None, (None, None)
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, extract_document, self._extractors, document)
+
+    async def _fetch_fallback(self, url: str) -> Extraction:
+        try:
+            logger.debug("Fetching {} with {}", url, JINA_STRATEGY)
+            text, html = await self._fetch_with_jina(url)
+        except (httpx.HTTPError, httpx.InvalidURL, ValueError) as error:
+            logger.warning("{} failed for {}: {}", JINA_STRATEGY, url, error)
+            return None, (None, None)
+        return (JINA_STRATEGY, (text, html)) if text else (None, (None, None))
+
+    async def _download(self, url: str) -> Document:
+        async with self._host_slot(url), self._http.stream("GET", url) as response:
+            response.raise_for_status()
+            content_type = response.headers.get("content-type", "").partition(";")[0].strip().lower()
+            if content_type and content_type not in HTML_CONTENT_TYPES:
+                raise UnsupportedContentError(content_type)
+
+            # Stream so binary bodies are rejected from their first bytes and huge pages stop at the byte cap.
+            chunks: list[bytes] = []
+            size = 0
+            truncated = False
+            async for chunk in response.aiter_bytes():
+                if not size and (sniffed := sniff_content_type(chunk)):
+                    raise UnsupportedContentError(sniffed)
+                if size + len(chunk) > self._max_body_bytes:
+                    chunks.append(chunk[: self._max_body_bytes - size])
+                    truncated = True
+                    break
+                chunks.append(chunk)
+                size += len(chunk)
+
+        if truncated:
+            logger.info("Truncated {} at {} bytes", url, self._max_body_bytes)
+            self.stats.truncated_urls.append(url)
+        return Document(
+            url=str(response.url),
+            status_code=response.status_code,
+            headers=dict(response.headers),
+            content=b"".join(chunks),
+            truncated=truncated,
+        )
+
+    async def _fetch_with_jina(self, url: str) -> FetchResult:
+        jina_url = f"{self._jina_base_url}{url}"
+        async with self._host_slot(jina_url):
+            response = await self._http.get(jina_url)
         response.raise_for_status()
         return response.text, None
+
+    def _host_slot(self, url: str) -> asyncio.Semaphore:
+        host = urlsplit(url).netloc.lower()
+        if host not in self._host_slots:
+            self._host_slots[host] = asyncio.Semaphore(self._max_connections_per_host)
+        return self._host_slots[host]
+
+    @property
+    def _http(self) -> httpx.AsyncClient:
+        if self._client is None:
+            raise RuntimeError("ContentFetcher must be used as an async context manager")
+        return self._client
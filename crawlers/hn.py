@@ -1,15 +1,24 @@
-from collections.abc import Callable
+import asyncio
+from collections.abc import Callable, Container
 from contextlib import AbstractAsyncContextManager
 from datetime import UTC, datetime
 from typing import Any, Protocol
 
 from content_fetcher import ContentFetcher
 from hackernews.client import HackerNewsClient
+from loguru import logger
 from models import Comment, Item
+from urls import normalize_url
+
+FetchResult = tuple[str | None, str | None]
 
 
 class FetchesContent(Protocol):
-    async def fetch(self, url: str) -> tuple[str | None, str | None]: ...
+    async def __aenter__(self) -> Any: ...
+
+    async def __aexit__(self, *exc_info: object) -> None: ...
+
+    async def fetch(self, url: str) -> FetchResult: ...
 
 
 class HackerNewsCrawler:
@@ -19,34 +28,64 @@ class HackerNewsCrawler:
         *,
         client_factory: Callable[..., AbstractAsyncContextManager[Any]] = HackerNewsClient,
         clock: Callable[[], datetime] | None = None,
+        fetch_concurrency: int = 8,
+        fetch_timeout: float | None = 60,
     ) -> None:
+        if fetch_concurrency < 1:
+            raise ValueError("fetch_concurrency must be at least 1")
         self._content_fetcher = content_fetcher
         self._client_factory = client_factory
         self._clock = clock or (lambda: datetime.now(UTC))
+        self._fetch_concurrency = fetch_concurrency
+        self._fetch_timeout = fetch_timeout
 
-    async def fetch_top_stories(self, cache_db_path: str, count: int = 3) -> list[Item]:
-        items: list[Item] = []
+    async def fetch_top_stories(
+        self,
+        cache_db_path: str,
+        count: int = 3,
+        *,
+        known_ids: Container[str] = frozenset(),
+        known_urls: Container[str] = frozenset(),
+    ) -> list[Item]:
         async with self._client_factory(cache_db_path=cache_db_path) as client:
             response = await client.fetch_top_stories(top_n=count, fetch_comment_levels_count=1)
-            for story in response.stories:
-                content = None
-                content_html = None
-                if story.url:
-                    content, content_html = await self._content_fetcher.fetch(url=story.url)
-
-                now = self._clock()
-                items.append(
-                    Item(
-                        title=story.title,
-                        url=f"https://news.ycombinator.com/item?id={story.id}",
-                        original_url=story.url,
-                        content=content,
-                        content_html=content_html,
-                        comments=[Comment(content=comment.text, author=comment.by) for comment in story.comments],
-                        published_at=story.time,
-                        id=str(story.id),
-                        created_at=now,
-                        updated_at=now,
-                    )
+
+        semaphore = asyncio.Semaphore(self._fetch_concurrency)
+
+        async def fetch_content(story: Any) -> FetchResult:
+            # Reconcile keeps the cached article for known Items and attaches the stored body for known URLs,
+            # so only their comments are worth fetching.
+            if not story.url or str(story.id) in known_ids or normalize_url(story.url) in known_urls:
+                return None, None
+            async with semaphore:
+                return await self._fetch_content(story.url)
+
+        async with self._content_fetcher:
+            contents = await asyncio.gather(*(fetch_content(story) for story in response.stories))
+
+        items: list[Item] = []
+        for story, (content, content_html) in zip(response.stories, contents, strict=True):
+            now = self._clock()
+            items.append(
+                Item(
+                    title=story.title,
+                    url=f"https://news.ycombinator.com/item?id={story.id}",
+                    original_url=story.url,
+                    content=content,
+                    content_html=content_html,
+                    comments=[Comment(content=comment.text, author=comment.by) for comment in story.comments],
+                    published_at=story.time,
+                    id=str(story.id),
+                    created_at=now,
+                    updated_at=now,
                 )
+            )
         return items
+
+    async def _fetch_content(self, url: str) -> FetchResult:
+        try:
+            async with asyncio.timeout(self._fetch_timeout):
+                return await self._content_fetcher.fetch(url=url)
+        except TimeoutError:
+            logger.warning("Fetching {} timed out after {}s", url, self._fetch_timeout)
+            return None, None
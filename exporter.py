@@ -1,6 +1,8 @@
+from collections.abc import Iterable
 from dataclasses import dataclass
 
-from models import Comment, Item, Perspective
+from json_codec import EXPORT_INDENT, ITEM_LIST_ADAPTER, encode_items
+from models import Item, ItemSummary, Perspective
 
 
 @dataclass(frozen=True, slots=True)
@@ -12,7 +14,7 @@ class FeedIdentity:
     tags: tuple[str, ...]
 
 
-def _perspective_to_markdown(perspective: Perspective, comments: list[Comment]) -> str:
+def _perspective_to_markdown(perspective: Perspective, comment_count: int) -> str:
     sections = [
         f"### AI Perspective: {perspective.title}\n",
         "<details><summary>Perspective Summary</summary>",
@@ -22,7 +24,7 @@ def _perspective_to_markdown(perspective: Perspective, comments: list[Comment])
     if perspective.viewpoints:
         sections.extend(
             [
-                f"### {len(perspective.viewpoints)} Key Viewpoints ({len(comments)} comments)",
+                f"### {len(perspective.viewpoints)} Key Viewpoints ({comment_count} comments)",
                 f"> **Overall Sentiment**: {perspective.sentiment}\n",
             ]
         )
@@ -32,18 +34,37 @@ def _perspective_to_markdown(perspective: Perspective, comments: list[Comment])
     return "\n".join(sections)
 
 
-def items_to_markdown(items: list[Item]) -> str:
+def summaries_to_markdown(summaries: Iterable[ItemSummary]) -> str:
     sections: list[str] = []
-    for item in items:
-        sections.append(f"## [{item.title}]({item.url})\n\n")
-        if item.ai_perspective:
-            sections.append(_perspective_to_markdown(item.ai_perspective, item.comments))
+    for summary in summaries:
+        sections.append(f"## [{summary.title}]({summary.url})\n\n")
+        if summary.ai_perspective:
+            sections.append(_perspective_to_markdown(summary.ai_perspective, summary.comment_count))
         sections.append("---\n")
     return "\n".join(sections)
 
 
+def items_to_markdown(items: list[Item]) -> str:
+    return summaries_to_markdown(
+        ItemSummary(
+            id=item.id,
+            title=item.title,
+            url=item.url,
+            updated_at=item.updated_at,
+            comment_count=len(item.comments),
+            ai_perspective=item.ai_perspective,
+        )
+        for item in items
+    )
+
+
 def items_to_raw_json(items: list[Item]) -> list[dict[str, object]]:
-    return [item.model_dump(mode="json") for item in items]
+    return ITEM_LIST_ADAPTER.dump_python(items, mode="json")
+
+
+def items_to_raw_json_bytes(items: list[Item]) -> bytes:
+    # Same document as items_to_raw_json, serialised without building the intermediate dicts.
+    return encode_items(items, indent=EXPORT_INDENT)
 
 
 def _content_text(item: Item) -> str | None:
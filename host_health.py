@@ -0,0 +1,175 @@
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import UTC, datetime, timedelta
+from enum import StrEnum
+from pathlib import Path
+from urllib.parse import urlsplit
+
+import aiosqlite
+from loguru import logger
+
+HOST_TABLE_NAME = "host_health"
+
+CREATE_TABLE_SQL = f"""
+CREATE TABLE IF NOT EXISTS {HOST_TABLE_NAME} (
+    host TEXT PRIMARY KEY,
+    consecutive_failures INTEGER NOT NULL,
+    open_until TEXT,
+    last_strategy TEXT,
+    fetch_count INTEGER NOT NULL,
+    failure_count INTEGER NOT NULL,
+    skip_count INTEGER NOT NULL,
+    total_seconds REAL NOT NULL,
+    updated_at TEXT NOT NULL
+)
+"""
+
+
+class Route(StrEnum):
+    DIRECT = "direct"
+    FALLBACK = "fallback"
+    SKIP = "skip"
+
+
+@dataclass(slots=True)
+class HostRecord:
+    consecutive_failures: int = 0
+    open_until: datetime | None = None
+    last_strategy: str | None = None
+    fetch_count: int = 0
+    failure_count: int = 0
+    skip_count: int = 0
+    total_seconds: float = 0.0
+    updated_at: datetime | None = None
+
+
+def host_of(url: str) -> str:
+    host = urlsplit(url).hostname or ""
+    return host.removeprefix("www.")
+
+
+class HostCircuitBreaker:
+    def __init__(
+        self,
+        path: str | Path,
+        *,
+        fallback_strategy: str = "Jina.ai",
+        failure_threshold: int = 3,
+        cooldown: timedelta = timedelta(days=3),
+        clock: Callable[[], datetime] | None = None,
+    ) -> None:
+        if failure_threshold < 1:
+            raise ValueError("failure_threshold must be at least 1")
+        self.path = Path(path)
+        # The breaker loads before the ItemStore that shares its database, so a cold start has no cache/ yet.
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._fallback_strategy = fallback_strategy
+        self._failure_threshold = failure_threshold
+        self._cooldown = cooldown
+        self._clock = clock or (lambda: datetime.now(UTC))
+        self.records: dict[str, HostRecord] = {}
+
+    async def load(self) -> None:
+        async with aiosqlite.connect(self.path) as database:
+            database.row_factory = aiosqlite.Row
+            await database.execute(CREATE_TABLE_SQL)
+            cursor = await database.execute(f"SELECT * FROM {HOST_TABLE_NAME}")
+            rows = await cursor.fetchall()
+        self.records = {
+            row["host"]: HostRecord(
+                consecutive_failures=row["consecutive_failures"],
+                open_until=datetime.fromisoformat(row["open_until"]) if row["open_until"] else None,
+                last_strategy=row["last_strategy"],
+                fetch_count=row["fetch_count"],
+                failure_count=row["failure_count"],
+                skip_count=row["skip_count"],
+                total_seconds=row["total_seconds"],
+                updated_at=datetime.fromisoformat(row["updated_at"]),
+            )
+            for row in rows
+        }
+        logger.info("Loaded health records for {} hosts", len(self.records))
+
+    async def save(self, before_days: int = 180) -> None:
+        cutoff = self._clock() - timedelta(days=before_days)
+        async with aiosqlite.connect(self.path) as database:
+            await database.execute(CREATE_TABLE_SQL)
+            await database.executemany(
+                f"""
+                INSERT INTO {HOST_TABLE_NAME} (
+                    host, consecutive_failures, open_until, last_strategy,
+                    fetch_count, failure_count, skip_count, total_seconds, updated_at
+                )
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(host) DO UPDATE SET
+                    consecutive_failures = excluded.consecutive_failures,
+                    open_until = excluded.open_until,
+                    last_strategy = excluded.last_strategy,
+                    fetch_count = excluded.fetch_count,
+                    failure_count = excluded.failure_count,
+                    skip_count = excluded.skip_count,
+                    total_seconds = excluded.total_seconds,
+                    updated_at = excluded.updated_at
+                """,
+                [
+                    (
+                        host,
+                        record.consecutive_failures,
+                        record.open_until.isoformat() if record.open_until else None,
+                        record.last_strategy,
+                        record.fetch_count,
+                        record.failure_count,
+                        record.skip_count,
+                        record.total_seconds,
+                        record.updated_at.isoformat(),
+                    )
+                    for host, record in self.records.items()
+                    if record.updated_at is not None
+                ],
+            )
+            await database.execute(f"DELETE FROM {HOST_TABLE_NAME} WHERE updated_at < ?", (cutoff.isoformat(),))
+            await database.commit()
+
+    def route(self, url: str) -> Route:
+        record = self.records.get(host_of(url))
+        if record is None or record.open_until is None or record.open_until <= self._clock():
+            return Route.DIRECT
+        if record.last_strategy == self._fallback_strategy:
+            return Route.FALLBACK
+        record.skip_count += 1
+        record.updated_at = self._clock()
+        return Route.SKIP
+
+    def record(self, url: str, *, direct_succeeded: bool | None, strategy: str | None, seconds: float) -> None:
+        now = self._clock()
+        record = self.records.setdefault(host_of(url), HostRecord())
+        record.fetch_count += 1
+        record.total_seconds += seconds
+        record.updated_at = now
+        if strategy is None:
+            record.failure_count += 1
+
+        if direct_succeeded:
+            record.consecutive_failures = 0
+            record.open_until = None
+        elif direct_succeeded is False:
+            record.consecutive_failures += 1
+            if record.consecutive_failures >= self._failure_threshold:
+                record.open_until = now + self._cooldown
+
+        # A fallback-only attempt that fails leaves nothing worth routing to until the cooldown ends.
+        if strategy is not None or direct_succeeded is None:
+            record.last_strategy = strategy
+
+    def log_costliest(self, limit: int = 10) -> None:
+        costliest = sorted(self.records.items(), key=lambda entry: entry[1].total_seconds, reverse=True)[:limit]
+        for host, record in costliest:
+            logger.info(
+                "Host {}: {:.1f}s over {} fetches, {} failed, {} skipped, circuit {}",
+                host,
+                record.total_seconds,
+                record.fetch_count,
+                record.failure_count,
+                record.skip_count,
+                "open" if record.open_until and record.open_until > self._clock() else "closed",
+            )
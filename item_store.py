@@ -1,79 +1,758 @@
+import hashlib
+import math
+import sqlite3
+from collections.abc import AsyncIterator, Awaitable, Callable, Iterable, Sequence
+from dataclasses import dataclass
 from datetime import UTC, datetime, timedelta
+from itertools import batched
 from pathlib import Path
+from types import TracebackType
+from typing import Self
 
 import aiosqlite
+from content_codec import compress_text, decompress_text
+from json_codec import decode_comments, decode_items, decode_perspective, encode_comments, encode_perspective
 from loguru import logger
-from models import Item
+from models import Comment, Item, ItemSummary, Perspective
+from urls import normalize_url
 
 ITEM_TABLE_NAME = "item"
+BODY_TABLE_NAME = "article_body"
+URL_TABLE_NAME = "article_url"
+COMMENTS_TABLE_NAME = "item_comments"
+PERSPECTIVE_TABLE_NAME = "item_perspective"
+SEARCH_ROW_TABLE_NAME = "item_search_row"
+SEARCH_TABLE_NAME = "item_search"
+# Tables this store owns, including the FTS5 shadow tables; the Hacker News client cache and the circuit breaker keep
+# their own tables in the same file, and the size bound must not count those.
+OWNED_TABLE_NAMES = (
+    ITEM_TABLE_NAME,
+    BODY_TABLE_NAME,
+    URL_TABLE_NAME,
+    COMMENTS_TABLE_NAME,
+    PERSPECTIVE_TABLE_NAME,
+    SEARCH_ROW_TABLE_NAME,
+    *(f"{SEARCH_TABLE_NAME}_{shadow}" for shadow in ("data", "idx", "docsize", "config")),
+)
+# Files written before the normalised schema keep each Item as one JSON payload in the item table.
+LEGACY_TABLE_NAME = "item_payload_v0"
+# Version 1 splits each payload into the tables above, with large text compressed, article bodies shared by content
+# hash, a search index and incremental auto-vacuum.
+SCHEMA_VERSION = 1
+INCREMENTAL_AUTO_VACUUM = 2
+# Stays under SQLITE_MAX_VARIABLE_NUMBER on old SQLite builds, which cap it at 999.
+LOOKUP_CHUNK_SIZE = 500
+# A stored body younger than this is reused for a resubmitted URL instead of fetching the article again.
+FRESH_BODY_MAX_AGE = timedelta(days=7)
+# bm25 weights for title, article text, comments and Perspective, in the order of the FTS columns.
+SEARCH_RANK = f"bm25({SEARCH_TABLE_NAME}, 10.0, 1.0, 2.0, 5.0)"
 
-CREATE_TABLE_SQL = f"""
-CREATE TABLE IF NOT EXISTS {ITEM_TABLE_NAME} (
-    id TEXT PRIMARY KEY,
-    created_at TEXT NOT NULL,
-    updated_at TEXT NOT NULL,
-    payload TEXT NOT NULL
+SCHEMA_SQL = (
+    f"""
+    CREATE TABLE IF NOT EXISTS {BODY_TABLE_NAME} (
+        hash TEXT PRIMARY KEY,
+        content TEXT,
+        content_html TEXT
+    )
+    """,
+    f"""
+    CREATE TABLE IF NOT EXISTS {ITEM_TABLE_NAME} (
+        id TEXT PRIMARY KEY,
+        title TEXT NOT NULL,
+        url TEXT NOT NULL,
+        original_url TEXT,
+        published_at TEXT,
+        created_at TEXT NOT NULL,
+        updated_at TEXT NOT NULL,
+        body_hash TEXT REFERENCES {BODY_TABLE_NAME}(hash)
+    )
+    """,
+    f"CREATE INDEX IF NOT EXISTS idx_{ITEM_TABLE_NAME}_updated_at ON {ITEM_TABLE_NAME}(updated_at)",
+    f"CREATE INDEX IF NOT EXISTS idx_{ITEM_TABLE_NAME}_body_hash ON {ITEM_TABLE_NAME}(body_hash)",
+    f"""
+    CREATE TABLE IF NOT EXISTS {URL_TABLE_NAME} (
+        url TEXT PRIMARY KEY,
+        body_hash TEXT NOT NULL REFERENCES {BODY_TABLE_NAME}(hash),
+        stored_at TEXT NOT NULL
+    )
+    """,
+    f"CREATE INDEX IF NOT EXISTS idx_{URL_TABLE_NAME}_body_hash ON {URL_TABLE_NAME}(body_hash)",
+    f"""
+    CREATE TABLE IF NOT EXISTS {COMMENTS_TABLE_NAME} (
+        item_id TEXT PRIMARY KEY REFERENCES {ITEM_TABLE_NAME}(id) ON DELETE CASCADE,
+        comment_count INTEGER NOT NULL,
+        comments TEXT NOT NULL
+    )
+    """,
+    f"""
+    CREATE TABLE IF NOT EXISTS {PERSPECTIVE_TABLE_NAME} (
+        item_id TEXT PRIMARY KEY REFERENCES {ITEM_TABLE_NAME}(id) ON DELETE CASCADE,
+        generated_at_comment_count INTEGER,
+        perspective TEXT NOT NULL,
+        comment_fingerprints TEXT
+    )
+    """,
+    # The FTS index is contentless, so the text it matches is kept only compressed in the tables above. This table
+    # gives each Item a stable FTS rowid and a hash of the text last indexed for it.
+    f"""
+    CREATE TABLE IF NOT EXISTS {SEARCH_ROW_TABLE_NAME} (
+        search_id INTEGER PRIMARY KEY,
+        item_id TEXT NOT NULL UNIQUE REFERENCES {ITEM_TABLE_NAME}(id) ON DELETE CASCADE,
+        text_hash TEXT NOT NULL
+    )
+    """,
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE_NAME} USING fts5(
+        title, content, comments, perspective, content = '', tokenize = 'porter unicode61'
+    )
+    """,
 )
+
+# Every part is upserted only when it differs, so unchanged comments and Perspectives are never rewritten.
+UPSERT_ITEM_SQL = f"""
+INSERT INTO {ITEM_TABLE_NAME} (id, title, url, original_url, published_at, created_at, updated_at, body_hash)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(id) DO UPDATE SET
+    title = excluded.title,
+    url = excluded.url,
+    original_url = excluded.original_url,
+    published_at = excluded.published_at,
+    updated_at = excluded.updated_at,
+    body_hash = excluded.body_hash
+"""
+# Bodies are immutable once stored under their hash.
+INSERT_BODY_SQL = f"""
+INSERT INTO {BODY_TABLE_NAME} (hash, content, content_html)
+VALUES (?, ?, ?)
+ON CONFLICT(hash) DO NOTHING
+"""
+# stored_at moves only when a URL gets a different body; refetching an unchanged article keeps the original time.
+UPSERT_URL_SQL = f"""
+INSERT INTO {URL_TABLE_NAME} (url, body_hash, stored_at)
+VALUES (?, ?, ?)
+ON CONFLICT(url) DO UPDATE SET
+    body_hash = excluded.body_hash,
+    stored_at = excluded.stored_at
+WHERE body_hash IS NOT excluded.body_hash
+"""
+UPSERT_COMMENTS_SQL = f"""
+INSERT INTO {COMMENTS_TABLE_NAME} (item_id, comment_count, comments)
+VALUES (?, ?, ?)
+ON CONFLICT(item_id) DO UPDATE SET
+    comment_count = excluded.comment_count,
+    comments = excluded.comments
+WHERE comments IS NOT excluded.comments
+"""
+UPSERT_PERSPECTIVE_SQL = f"""
+INSERT INTO {PERSPECTIVE_TABLE_NAME} (item_id, generated_at_comment_count, perspective, comment_fingerprints)
+VALUES (?, ?, ?, ?)
+ON CONFLICT(item_id) DO UPDATE SET
+    generated_at_comment_count = excluded.generated_at_comment_count,
+    perspective = excluded.perspective,
+    comment_fingerprints = excluded.comment_fingerprints
+WHERE generated_at_comment_count IS NOT excluded.generated_at_comment_count
+    OR perspective IS NOT excluded.perspective
+    OR comment_fingerprints IS NOT excluded.comment_fingerprints
+"""
+
+# Only Items whose searchable text hash changed are re-indexed.
+UPSERT_SEARCH_ROW_SQL = f"""
+INSERT INTO {SEARCH_ROW_TABLE_NAME} (item_id, text_hash)
+VALUES (?, ?)
+ON CONFLICT(item_id) DO UPDATE SET
+    text_hash = excluded.text_hash
 """
+INSERT_SEARCH_SQL = f"""
+INSERT INTO {SEARCH_TABLE_NAME} (rowid, title, content, comments, perspective)
+VALUES (?, ?, ?, ?, ?)
+"""
+# A contentless index can only drop a row when given the exact text that was indexed for it.
+DELETE_SEARCH_SQL = f"""
+INSERT INTO {SEARCH_TABLE_NAME} ({SEARCH_TABLE_NAME}, rowid, title, content, comments, perspective)
+VALUES ('delete', ?, ?, ?, ?, ?)
+"""
+
+
+@dataclass(frozen=True, slots=True)
+class RetentionPolicy:
+    max_age: timedelta = timedelta(days=180)
+    # When the live pages of the file exceed this, the least recently updated Items are evicted first.
+    max_bytes: int | None = None
+    # Deletes commit per chunk, so other connections to the file are never blocked for a whole cleanup.
+    chunk_size: int = 500
+    # Free pages handed back to the filesystem per cleanup; the rest stay for reuse by the next saves.
+    vacuum_pages: int = 4096
+    # Search index pages merged after each delete pass, which drops the tombstones the deletes left.
+    merge_pages: int = 256
+
+    def __post_init__(self) -> None:
+        if self.chunk_size < 1:
+            raise ValueError("chunk_size must be at least 1")
+        if self.merge_pages < 1:
+            raise ValueError("merge_pages must be at least 1")
+        if self.max_bytes is not None and self.max_bytes < 1:
+            raise ValueError("max_bytes must be positive")
+
+
+def article_hash(content: str | None, content_html: str | None) -> str | None:
+    if content is None and content_html is None:
+        return None
+    return hashlib.sha256(f"{content or ''}\0{content_html or ''}".encode()).hexdigest()
+
+
+def search_text(
+    title: str,
+    content: str | None,
+    comments: list[Comment],
+    perspective: Perspective | None,
+) -> tuple[str, str, str, str]:
+    perspective_text = (
+        "\n".join([perspective.title, perspective.summary, *(view.statement for view in perspective.viewpoints)])
+        if perspective
+        else ""
+    )
+    return title, content or "", "\n".join(comment.content for comment in comments), perspective_text
+
+
+def search_text_hash(text: tuple[str, str, str, str]) -> str:
+    return hashlib.sha256("\0".join(text).encode()).hexdigest()
+
+
+def match_expression(query: str) -> str:
+    # Every word is quoted, so input like "c++" or "AND" is searched for as text rather than parsed as FTS5 syntax.
+    terms = (term.replace('"', '""') for term in query.split())
+    return " ".join(f'"{term}"' for term in terms)
 
 
 class ItemStore:
-    def __init__(self, path: str | Path) -> None:
+    def __init__(
+        self,
+        path: str | Path,
+        *,
+        mmap_size: int = 256 * 1024 * 1024,
+        cache_size_kib: int = 64 * 1024,
+        retention: RetentionPolicy | None = None,
+    ) -> None:
         self.path = Path(path)
         self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._mmap_size = mmap_size
+        self._cache_size_kib = cache_size_kib
+        self._retention = retention or RetentionPolicy()
+        self._connection: aiosqlite.Connection | None = None
 
-    async def init(self) -> None:
-        async with aiosqlite.connect(self.path) as database:
-            await database.execute(CREATE_TABLE_SQL)
-            await database.execute(
-                f"CREATE INDEX IF NOT EXISTS idx_{ITEM_TABLE_NAME}_updated_at ON {ITEM_TABLE_NAME}(updated_at)"
-            )
-            await database.commit()
+    async def __aenter__(self) -> Self:
+        self._connection = await aiosqlite.connect(self.path)
+        self._connection.row_factory = aiosqlite.Row
+        # WAL lets the Hacker News client cache and the circuit breaker use the same file while this connection is open;
+        # with synchronous=NORMAL a commit no longer waits on fsync, only checkpoints do.
+        await self._connection.execute("PRAGMA journal_mode = WAL")
+        await self._connection.execute("PRAGMA synchronous = NORMAL")
+        await self._connection.execute(f"PRAGMA mmap_size = {int(self._mmap_size)}")
+        await self._connection.execute(f"PRAGMA cache_size = -{int(self._cache_size_kib)}")
+        await self._connection.execute("PRAGMA foreign_keys = ON")
+        # Takes effect immediately on a new file; a payload file switches when its migration ends with VACUUM.
+        await self._connection.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        await self._migrate()
         logger.info("ItemStore initialized at {}", self.path)
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        connection, self._connection = self._connection, None
+        if connection is not None:
+            await connection.close()
 
     async def reconcile(self, now: datetime, fetched: list[Item]) -> list[Item]:
+        cached_rows = await self._get_many([item.id for item in fetched])
+        # New Items whose article was not fetched because another Item already stored a fresh body for the URL.
+        skipped_urls = {
+            item.id: normalize_url(item.original_url)
+            for item in fetched
+            if item.id not in cached_rows and item.original_url and item.content is None
+        }
+        stored_bodies = await self._get_bodies_by_url(list(skipped_urls.values()))
         reconciled: list[Item] = []
         for fresh_item in fetched:
-            cached_item = await self._get(fresh_item.id)
-            if cached_item is None:
-                reconciled.append(fresh_item)
+            row = cached_rows.get(fresh_item.id)
+            if row is None:
+                body = stored_bodies.get(skipped_urls.get(fresh_item.id, ""))
+                if body is None:
+                    reconciled.append(fresh_item)
+                    continue
+                update = {
+                    "content": decompress_text(body["content"]),
+                    "content_html": decompress_text(body["content_html"]),
+                }
+                reconciled.append(fresh_item.model_copy(update=update))
                 continue
-            reconciled.append(cached_item.model_copy(update={"comments": fresh_item.comments, "updated_at": now}))
+            # Cached comments are never read back: the fresh ones replace them.
+            reconciled.append(
+                Item(
+                    id=row["id"],
+                    title=row["title"],
+                    url=row["url"],
+                    original_url=row["original_url"],
+                    content=decompress_text(row["content"]),
+                    content_html=decompress_text(row["content_html"]),
+                    comments=fresh_item.comments,
+                    published_at=row["published_at"],
+                    created_at=row["created_at"],
+                    updated_at=now,
+                    generated_at_comment_count=row["generated_at_comment_count"],
+                    generated_from_comments=(
+                        row["comment_fingerprints"].split() if row["comment_fingerprints"] is not None else None
+                    ),
+                    ai_perspective=decode_perspective(row["perspective"]),
+                )
+            )
         return reconciled
 
+    async def known_ids(self) -> set[str]:
+        cursor = await self._database.execute(f"SELECT id FROM {ITEM_TABLE_NAME}")
+        rows = await cursor.fetchall()
+        return {row[0] for row in rows}
+
+    async def known_urls(self, max_age: timedelta = FRESH_BODY_MAX_AGE) -> set[str]:
+        cutoff = datetime.now(UTC) - max_age
+        cursor = await self._database.execute(
+            f"SELECT url FROM {URL_TABLE_NAME} WHERE stored_at >= ?",
+            (cutoff.isoformat(),),
+        )
+        rows = await cursor.fetchall()
+        return {row[0] for row in rows}
+
+    async def iter_summaries(self, since: datetime | None = None) -> AsyncIterator[ItemSummary]:
+        # Newest first through the updated_at index; article bodies and comment payloads are never read.
+        cursor = await self._database.execute(
+            f"""
+            SELECT
+                item.id, item.title, item.url, item.updated_at,
+                COALESCE(comments.comment_count, 0) AS comment_count, perspective.perspective
+            FROM {ITEM_TABLE_NAME} AS item
+            LEFT JOIN {COMMENTS_TABLE_NAME} AS comments ON comments.item_id = item.id
+            LEFT JOIN {PERSPECTIVE_TABLE_NAME} AS perspective ON perspective.item_id = item.id
+            WHERE item.updated_at >= ?
+            ORDER BY item.updated_at DESC
+            """,
+            (since.isoformat() if since else "",),
+        )
+        async for row in cursor:
+            yield ItemSummary(
+                id=row["id"],
+                title=row["title"],
+                url=row["url"],
+                updated_at=row["updated_at"],
+                comment_count=row["comment_count"],
+                ai_perspective=decode_perspective(row["perspective"]),
+            )
+
+    async def search(self, query: str, since: datetime | None = None, limit: int = 20) -> list[ItemSummary]:
+        if not (expression := match_expression(query)):
+            return []
+        cursor = await self._database.execute(
+            f"""
+            SELECT
+                item.id, item.title, item.url, item.updated_at,
+                COALESCE(comments.comment_count, 0) AS comment_count, perspective.perspective
+            FROM {SEARCH_TABLE_NAME}
+            JOIN {SEARCH_ROW_TABLE_NAME} AS search_row ON search_row.search_id = {SEARCH_TABLE_NAME}.rowid
+            JOIN {ITEM_TABLE_NAME} AS item ON item.id = search_row.item_id
+            LEFT JOIN {COMMENTS_TABLE_NAME} AS comments ON comments.item_id = item.id
+            LEFT JOIN {PERSPECTIVE_TABLE_NAME} AS perspective ON perspective.item_id = item.id
+            WHERE {SEARCH_TABLE_NAME} MATCH ? AND item.updated_at >= ?
+            ORDER BY {SEARCH_RANK}
+            LIMIT ?
+            """,
+            (expression, since.isoformat() if since else "", limit),
+        )
+        return [
+            ItemSummary(
+                id=row["id"],
+                title=row["title"],
+                url=row["url"],
+                updated_at=row["updated_at"],
+                comment_count=row["comment_count"],
+                ai_perspective=decode_perspective(row["perspective"]),
+            )
+            for row in await cursor.fetchall()
+        ]
+
     async def save(self, item: Item) -> None:
-        async with aiosqlite.connect(self.path) as database:
-            await database.execute(
-                f"""
-                INSERT INTO {ITEM_TABLE_NAME} (id, created_at, updated_at, payload)
-                VALUES (?, ?, ?, ?)
-                ON CONFLICT(id) DO UPDATE SET
-                    updated_at = excluded.updated_at,
-                    payload = excluded.payload
-                """,
+        await self.save_many([item])
+
+    async def save_many(self, items: Iterable[Item], chunk_size: int | None = None) -> int:
+        if chunk_size is not None and chunk_size < 1:
+            raise ValueError("chunk_size must be at least 1")
+        saved_count = 0
+        # Chunks only bound how many serialised payloads are held at once; all of them commit together or not at all.
+        try:
+            for chunk in batched(items, chunk_size) if chunk_size else [tuple(items)]:
+                await self._write(chunk)
+                saved_count += len(chunk)
+        except BaseException:
+            await self._database.rollback()
+            raise
+        await self._database.commit()
+        return saved_count
+
+    async def cleanup(self) -> int:
+        policy = self._retention
+        cutoff = (datetime.now(UTC) - policy.max_age).isoformat()
+        # Comments, Perspectives and search rows follow through ON DELETE CASCADE once the index has dropped the text.
+        expired_count = await self._delete_in_chunks(
+            ITEM_TABLE_NAME,
+            "id",
+            f"SELECT id FROM {ITEM_TABLE_NAME} WHERE updated_at < ?",
+            (cutoff,),
+            before_delete=self._unindex,
+        )
+        orphaned_count = await self._delete_orphaned_bodies()
+        if expired_count:
+            await self._merge_search_index()
+
+        evicted_count = 0
+        previous_bytes = None
+        while policy.max_bytes is not None and (live_bytes := await self._live_bytes()) > policy.max_bytes:
+            if previous_bytes is not None and live_bytes >= previous_bytes:
+                logger.warning(
+                    "{} still takes {} bytes for Items after evicting {}; stopping short of {} bytes",
+                    self.path,
+                    live_bytes,
+                    evicted_count,
+                    policy.max_bytes,
+                )
+                break
+            previous_bytes = live_bytes
+            cursor = await self._database.execute(f"SELECT COUNT(*) FROM {ITEM_TABLE_NAME}")
+            if not (item_count := (await cursor.fetchone())[0]):
+                logger.warning("{} still exceeds {} bytes with no Items left to evict", self.path, policy.max_bytes)
+                break
+            # Evict in proportion to the excess so a pass does not overshoot the bound by a whole chunk.
+            excess_share = (live_bytes - policy.max_bytes) / live_bytes
+            evict_count = min(policy.chunk_size, max(1, math.ceil(item_count * excess_share)))
+            cursor = await self._database.execute(
+                f"SELECT id FROM {ITEM_TABLE_NAME} ORDER BY updated_at LIMIT ?",
+                (evict_count,),
+            )
+            item_ids = [row[0] for row in await cursor.fetchall()]
+            await self._unindex(item_ids)
+            await self._database.execute(
+                f"DELETE FROM {ITEM_TABLE_NAME} WHERE id IN ({', '.join('?' * len(item_ids))})",
+                item_ids,
+            )
+            await self._database.commit()
+            evicted_count += len(item_ids)
+            orphaned_count += await self._delete_orphaned_bodies()
+            await self._merge_search_index()
+
+        reclaimed_pages = await self._incremental_vacuum(policy.vacuum_pages)
+        logger.info(
+            "Cleaned up {} Items older than {} days and evicted {} for size, {} orphaned bodies, reclaimed {} pages",
+            expired_count,
+            policy.max_age.days,
+            evicted_count,
+            orphaned_count,
+            reclaimed_pages,
+        )
+        return expired_count + evicted_count
+
+    async def _delete_orphaned_bodies(self) -> int:
+        # A URL keeps its body only while some Item still references it; then the body itself goes.
+        await self._delete_in_chunks(
+            URL_TABLE_NAME,
+            "url",
+            f"""
+            SELECT url FROM {URL_TABLE_NAME}
+            WHERE NOT EXISTS (SELECT 1 FROM {ITEM_TABLE_NAME} WHERE body_hash = {URL_TABLE_NAME}.body_hash)
+            """,
+        )
+        return await self._delete_in_chunks(
+            BODY_TABLE_NAME,
+            "hash",
+            f"""
+            SELECT hash FROM {BODY_TABLE_NAME}
+            WHERE NOT EXISTS (SELECT 1 FROM {ITEM_TABLE_NAME} WHERE body_hash = {BODY_TABLE_NAME}.hash)
+                AND NOT EXISTS (SELECT 1 FROM {URL_TABLE_NAME} WHERE body_hash = {BODY_TABLE_NAME}.hash)
+            """,
+        )
+
+    async def _delete_in_chunks(
+        self,
+        table: str,
+        key: str,
+        select_sql: str,
+        parameters: tuple[str, ...] = (),
+        before_delete: Callable[[list[str]], Awaitable[None]] | None = None,
+    ) -> int:
+        chunk_size = self._retention.chunk_size
+        deleted_count = 0
+        while True:
+            cursor = await self._database.execute(f"{select_sql} LIMIT ?", (*parameters, chunk_size))
+            keys = [row[0] for row in await cursor.fetchall()]
+            if keys:
+                if before_delete is not None:
+                    await before_delete(keys)
+                await self._database.execute(
+                    f"DELETE FROM {table} WHERE {key} IN ({', '.join('?' * len(keys))})",
+                    keys,
+                )
+                await self._database.commit()
+                deleted_count += len(keys)
+            if len(keys) < chunk_size:
+                return deleted_count
+
+    async def _merge_search_index(self) -> None:
+        # FTS5 records deleted rows as tombstones until its segments merge; until then their pages stay live.
+        # A negative page count merges across levels but stops after that many pages, unlike a full 'optimize'.
+        await self._database.execute(
+            f"INSERT INTO {SEARCH_TABLE_NAME} ({SEARCH_TABLE_NAME}, rank) VALUES ('merge', ?)",
+            (-self._retention.merge_pages,),
+        )
+        await self._database.commit()
+
+    async def _live_bytes(self) -> int:
+        # dbstat only counts pages in use, so free pages awaiting the incremental vacuum are already left out.
+        names = await self._select_in(
+            "SELECT name FROM sqlite_schema WHERE type IN ('table', 'index') AND tbl_name IN ({})",
+            list(OWNED_TABLE_NAMES),
+        )
+        try:
+            stats = await self._select_in(
+                "SELECT SUM(pgsize) FROM dbstat WHERE aggregate = TRUE AND name IN ({})",
+                [row[0] for row in names],
+            )
+        except sqlite3.OperationalError:
+            # dbstat is an optional compile-time extension; without it the bound falls back to the stored bytes.
+            return await self._stored_bytes()
+        return sum(row[0] or 0 for row in stats)
+
+    async def _stored_bytes(self) -> int:
+        # Sums the values in each owned table, which leaves out indexes and page overhead.
+        tables = await self._select_in(
+            "SELECT name FROM sqlite_schema WHERE type = 'table' AND name IN ({})", list(OWNED_TABLE_NAMES)
+        )
+        stored_bytes = 0
+        for table in (row[0] for row in tables):
+            cursor = await self._database.execute("SELECT name FROM pragma_table_info(?)", (table,))
+            lengths = [f'COALESCE(length(CAST("{row[0]}" AS BLOB)), 0)' for row in await cursor.fetchall()]
+            cursor = await self._database.execute(f"SELECT SUM({' + '.join(lengths)}) FROM {table}")
+            stored_bytes += (await cursor.fetchone())[0] or 0
+        return stored_bytes
+
+    async def _incremental_vacuum(self, pages: int) -> int:
+        cursor = await self._database.execute("PRAGMA freelist_count")
+        free_before = (await cursor.fetchone())[0]
+        cursor = await self._database.execute(f"PRAGMA incremental_vacuum({int(pages)})")
+        await cursor.fetchall()
+        cursor = await self._database.execute("PRAGMA freelist_count")
+        return free_before - (await cursor.fetchone())[0]
+
+    async def _write(self, items: Sequence[Item]) -> None:
+        texts = {item.id: search_text(item.title, item.content, item.comments, item.ai_perspective) for item in items}
+        text_hashes = {item_id: search_text_hash(text) for item_id, text in texts.items()}
+        indexed = await self._select_in(
+            f"SELECT item_id, text_hash FROM {SEARCH_ROW_TABLE_NAME} WHERE item_id IN ({{}})", list(texts)
+        )
+        indexed_hashes = {row["item_id"]: row["text_hash"] for row in indexed}
+        changed_ids = [
+            item_id for item_id, text_hash in text_hashes.items() if indexed_hashes.get(item_id) != text_hash
+        ]
+        # The old text is rebuilt from the stored parts, so it has to leave the index before they are overwritten.
+        await self._unindex([item_id for item_id in changed_ids if item_id in indexed_hashes])
+        body_hashes = [article_hash(item.content, item.content_html) for item in items]
+        await self._store_bodies(
+            {
+                body_hash: (item.content, item.content_html)
+                for item, body_hash in zip(items, body_hashes, strict=True)
+                if body_hash is not None
+            }
+        )
+        await self._database.executemany(
+            UPSERT_ITEM_SQL,
+            [
                 (
                     item.id,
+                    item.title,
+                    item.url,
+                    item.original_url,
+                    item.published_at.isoformat() if item.published_at else None,
                     item.created_at.isoformat(),
                     item.updated_at.isoformat(),
-                    item.model_dump_json(),
-                ),
-            )
-            await database.commit()
-
-    async def cleanup(self, before_days: int = 180) -> int:
-        cutoff = datetime.now(UTC) - timedelta(days=before_days)
-        async with aiosqlite.connect(self.path) as database:
-            cursor = await database.execute(
-                f"DELETE FROM {ITEM_TABLE_NAME} WHERE updated_at < ?",
-                (cutoff.isoformat(),),
-            )
-            await database.commit()
-            deleted_count = cursor.rowcount
-        logger.info("Cleaned up {} Items older than {} days", deleted_count, before_days)
-        return deleted_count
-
-    async def _get(self, item_id: str) -> Item | None:
-        async with aiosqlite.connect(self.path) as database:
-            cursor = await database.execute(f"SELECT payload FROM {ITEM_TABLE_NAME} WHERE id = ?", (item_id,))
-            row = await cursor.fetchone()
-        return Item.model_validate_json(row[0]) if row else None
+                    body_hash,
+                )
+                for item, body_hash in zip(items, body_hashes, strict=True)
+            ],
+        )
+        await self._database.executemany(
+            UPSERT_URL_SQL,
+            [
+                (normalize_url(item.original_url), body_hash, item.updated_at.isoformat())
+                for item, body_hash in zip(items, body_hashes, strict=True)
+                if body_hash is not None and item.original_url
+            ],
+        )
+        await self._database.executemany(
+            UPSERT_COMMENTS_SQL,
+            [(item.id, len(item.comments), compress_text(encode_comments(item.comments))) for item in items],
+        )
+        await self._database.executemany(
+            UPSERT_PERSPECTIVE_SQL,
+            [
+                (
+                    item.id,
+                    item.generated_at_comment_count,
+                    encode_perspective(item.ai_perspective),
+                    # Fingerprints are hex digests, so a space-separated string round-trips without JSON.
+                    " ".join(item.generated_from_comments) if item.generated_from_comments is not None else None,
+                )
+                for item in items
+                if item.ai_perspective is not None
+            ],
+        )
+        await self._database.executemany(
+            f"DELETE FROM {PERSPECTIVE_TABLE_NAME} WHERE item_id = ?",
+            [(item.id,) for item in items if item.ai_perspective is None],
+        )
+        await self._database.executemany(
+            UPSERT_SEARCH_ROW_SQL, [(item_id, text_hashes[item_id]) for item_id in changed_ids]
+        )
+        rows = await self._select_in(
+            f"SELECT item_id, search_id FROM {SEARCH_ROW_TABLE_NAME} WHERE item_id IN ({{}})", changed_ids
+        )
+        await self._database.executemany(
+            INSERT_SEARCH_SQL, [(row["search_id"], *texts[row["item_id"]]) for row in rows]
+        )
+
+    async def _unindex(self, item_ids: list[str]) -> None:
+        rows = await self._select_in(
+            f"""
+            SELECT search_row.search_id, item.title, body.content, comments.comments, perspective.perspective
+            FROM {SEARCH_ROW_TABLE_NAME} AS search_row
+            JOIN {ITEM_TABLE_NAME} AS item ON item.id = search_row.item_id
+            LEFT JOIN {BODY_TABLE_NAME} AS body ON body.hash = item.body_hash
+            LEFT JOIN {COMMENTS_TABLE_NAME} AS comments ON comments.item_id = item.id
+            LEFT JOIN {PERSPECTIVE_TABLE_NAME} AS perspective ON perspective.item_id = item.id
+            WHERE search_row.item_id IN ({{}})
+            """,
+            item_ids,
+        )
+        await self._database.executemany(
+            DELETE_SEARCH_SQL,
+            [
+                (
+                    row["search_id"],
+                    *search_text(
+                        row["title"],
+                        decompress_text(row["content"]),
+                        decode_comments(decompress_text(row["comments"])) if row["comments"] else [],
+                        decode_perspective(row["perspective"]),
+                    ),
+                )
+                for row in rows
+            ],
+        )
+
+    async def _store_bodies(self, bodies: dict[str, tuple[str | None, str | None]]) -> None:
+        # Skip bodies that are already stored so unchanged articles are not compressed again on every run.
+        stored = await self._select_in(f"SELECT hash FROM {BODY_TABLE_NAME} WHERE hash IN ({{}})", list(bodies))
+        stored_hashes = {row[0] for row in stored}
+        await self._database.executemany(
+            INSERT_BODY_SQL,
+            [
+                (body_hash, compress_text(content), compress_text(content_html, html=True))
+                for body_hash, (content, content_html) in bodies.items()
+                if body_hash not in stored_hashes
+            ],
+        )
+
+    async def _get_many(self, item_ids: list[str]) -> dict[str, aiosqlite.Row]:
+        rows = await self._select_in(
+            f"""
+            SELECT
+                item.id, item.title, item.url, item.original_url, item.published_at, item.created_at,
+                body.content, body.content_html,
+                perspective.generated_at_comment_count, perspective.perspective, perspective.comment_fingerprints
+            FROM {ITEM_TABLE_NAME} AS item
+            LEFT JOIN {BODY_TABLE_NAME} AS body ON body.hash = item.body_hash
+            LEFT JOIN {PERSPECTIVE_TABLE_NAME} AS perspective ON perspective.item_id = item.id
+            WHERE item.id IN ({{}})
+            """,
+            item_ids,
+        )
+        return {row["id"]: row for row in rows}
+
+    async def _get_bodies_by_url(self, urls: list[str]) -> dict[str, aiosqlite.Row]:
+        rows = await self._select_in(
+            f"""
+            SELECT url.url, body.content, body.content_html
+            FROM {URL_TABLE_NAME} AS url
+            JOIN {BODY_TABLE_NAME} AS body ON body.hash = url.body_hash
+            WHERE url.url IN ({{}})
+            """,
+            urls,
+        )
+        return {row["url"]: row for row in rows}
+
+    async def _select_in(self, sql: str, values: list[str]) -> list[aiosqlite.Row]:
+        # sql has one {} where the IN list goes; values are looked up in chunks of LOOKUP_CHUNK_SIZE.
+        rows: list[aiosqlite.Row] = []
+        for chunk in batched(dict.fromkeys(values), LOOKUP_CHUNK_SIZE):
+            cursor = await self._database.execute(sql.format(", ".join("?" * len(chunk))), chunk)
+            rows.extend(await cursor.fetchall())
+        return rows
+
+    async def _migrate(self) -> None:
+        cursor = await self._database.execute("PRAGMA user_version")
+        if (await cursor.fetchone())[0] >= SCHEMA_VERSION:
+            return
+
+        legacy = await self._has_column(ITEM_TABLE_NAME, "payload")
+        # One transaction, so an interrupted migration leaves the payload table untouched.
+        await self._database.execute("BEGIN")
+        try:
+            migrated_count = await self._normalise_payloads(legacy)
+            await self._database.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        except BaseException:
+            await self._database.rollback()
+            raise
+        await self._database.commit()
+
+        cursor = await self._database.execute("PRAGMA auto_vacuum")
+        auto_vacuum = (await cursor.fetchone())[0]
+        # Dropping the payloads frees pages in the file, and an existing file only changes auto-vacuum mode on VACUUM.
+        if migrated_count or auto_vacuum != INCREMENTAL_AUTO_VACUUM:
+            await self._database.execute("VACUUM")
+        if migrated_count:
+            logger.info("Migrated {} stored Items to schema version {}", migrated_count, SCHEMA_VERSION)
+
+    async def _has_column(self, table: str, column: str) -> bool:
+        cursor = await self._database.execute("SELECT 1 FROM pragma_table_info(?) WHERE name = ?", (table, column))
+        return await cursor.fetchone() is not None
+
+    async def _normalise_payloads(self, legacy: bool) -> int:
+        if legacy:
+            await self._database.execute(f"ALTER TABLE {ITEM_TABLE_NAME} RENAME TO {LEGACY_TABLE_NAME}")
+            await self._database.execute(f"DROP INDEX IF EXISTS idx_{ITEM_TABLE_NAME}_updated_at")
+        for statement in SCHEMA_SQL:
+            await self._database.execute(statement)
+        if not legacy:
+            return 0
+
+        migrated_count = 0
+        cursor = await self._database.execute(f"SELECT payload FROM {LEGACY_TABLE_NAME}")
+        while rows := await cursor.fetchmany(LOOKUP_CHUNK_SIZE):
+            items = decode_items(f"[{','.join(row[0] for row in rows)}]")
+            await self._write(items)
+            migrated_count += len(items)
+        await self._database.execute(f"DROP TABLE {LEGACY_TABLE_NAME}")
+        return migrated_count
+
+    @property
+    def _database(self) -> aiosqlite.Connection:
+        if self._connection is None:
+            raise RuntimeError("ItemStore must be used as an async context manager")
+        return self._connection
@@ -0,0 +1,42 @@
+from collections.abc import Sequence
+
+from models import Comment, Item, Perspective
+from pydantic import TypeAdapter
+from pydantic_core import to_json
+
+# Building a TypeAdapter compiles its schema, so each one is built once at import and shared.
+ITEM_LIST_ADAPTER = TypeAdapter(list[Item])
+COMMENT_LIST_ADAPTER = TypeAdapter(list[Comment])
+PERSPECTIVE_ADAPTER = TypeAdapter(Perspective)
+
+# Matches json.dump(..., indent=2, ensure_ascii=False) byte for byte.
+EXPORT_INDENT = 2
+
+
+def encode_json(value: object, *, indent: int | None = None) -> bytes:
+    # Serialises dicts, lists and pydantic models straight to UTF-8 bytes in pydantic-core.
+    return to_json(value, indent=indent)
+
+
+def encode_items(items: Sequence[Item], *, indent: int | None = None) -> bytes:
+    return ITEM_LIST_ADAPTER.dump_json(list(items), indent=indent)
+
+
+def decode_items(data: str | bytes) -> list[Item]:
+    return ITEM_LIST_ADAPTER.validate_json(data)
+
+
+def encode_comments(comments: list[Comment]) -> str:
+    return COMMENT_LIST_ADAPTER.dump_json(comments).decode()
+
+
+def decode_comments(data: str | bytes) -> list[Comment]:
+    return COMMENT_LIST_ADAPTER.validate_json(data)
+
+
+def encode_perspective(perspective: Perspective) -> str:
+    return PERSPECTIVE_ADAPTER.dump_json(perspective).decode()
+
+
+def decode_perspective(data: str | bytes | None) -> Perspective | None:
+    return PERSPECTIVE_ADAPTER.validate_json(data) if data else None
@@ -1,7 +1,10 @@
 import asyncio
-import json
 import os
-from datetime import UTC, datetime
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
 
 import dotenv
 from content_fetcher import ContentFetcher
@@ -10,12 +13,15 @@ from exporter import (
     FeedIdentity,
     items_to_json_feed,
     items_to_markdown,
-    items_to_raw_json,
+    items_to_raw_json_bytes,
 )
-from item_store import ItemStore
+from host_health import HostCircuitBreaker
+from item_store import ItemStore, RetentionPolicy
+from json_codec import EXPORT_INDENT, encode_json
 from loguru import logger
 from models import Item
-from perspective_generator import SmolLLMPerspectiveGenerator
+from perspective_cache import PerspectiveCache
+from perspective_generator import PerspectiveGenerator, SmolLLMPerspectiveGenerator
 from transformer import Transformer
 
 HACKER_NEWS_FEED = FeedIdentity(
@@ -36,67 +42,165 @@ def llm_enabled() -> bool:
     raise ValueError("ENABLE_LLM must be 'true' or 'false'")
 
 
-async def apply_perspectives(*, items: list[Item], enabled: bool) -> list[Item]:
+async def apply_perspectives(
+    *,
+    items: list[Item],
+    enabled: bool,
+    perspective_generator: PerspectiveGenerator | None = None,
+    cache_path: str | Path | None = None,
+) -> list[Item]:
     if not enabled:
         logger.info("LLM disabled; preserving cached Perspectives")
         return items
 
     logger.info("Generating or refreshing Perspectives")
-    perspective_generator = SmolLLMPerspectiveGenerator.from_env()
-    return await Transformer(perspective_generator=perspective_generator).transform(items=items)
+    if perspective_generator is not None or cache_path is None:
+        return await transform_items(items, perspective_generator or SmolLLMPerspectiveGenerator.from_env())
 
+    # One cache connection serves every generation of the run
+    ttl = timedelta(days=int(os.getenv("PERSPECTIVE_CACHE_DAYS", "30")))
+    async with PerspectiveCache(cache_path, ttl=ttl) as cache:
+        await cache.expire()
+        return await transform_items(items, SmolLLMPerspectiveGenerator.from_env(cache=cache))
 
-async def main():
-    _ = dotenv.load_dotenv()
-    enable_llm = llm_enabled()
 
-    # Initialize ItemStore
-    db_path = "cache/social.sqlite"
-    store = ItemStore(path=db_path)
-    await store.init()
+async def transform_items(items: list[Item], perspective_generator: PerspectiveGenerator) -> list[Item]:
+    transformer = Transformer(
+        perspective_generator=perspective_generator,
+        concurrency=int(os.getenv("LLM_CONCURRENCY", "4")),
+        requests_per_minute=float(rpm) if (rpm := os.getenv("LLM_REQUESTS_PER_MINUTE")) else None,
+        incremental_refresh=os.getenv("LLM_INCREMENTAL_REFRESH", "true").strip().lower() != "false",
+        batch_size=int(os.getenv("LLM_BATCH_SIZE", "1")),
+    )
+    return await transformer.transform(items=items)
+
+
+class StageTimer:
+    def __init__(self) -> None:
+        self.seconds: dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.seconds[name] = self.seconds.get(name, 0.0) + time.perf_counter() - started
+
+
+def write_outputs(items: list[Item], output_dir: Path) -> None:
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    # Generate JSON Feed file
+    json_feed = items_to_json_feed(items, identity=HACKER_NEWS_FEED, skip_none_perspective=True)
+    _ = (output_dir / "hackernews.rss.json").write_bytes(encode_json(json_feed, indent=EXPORT_INDENT))
+    logger.info("Generated JSON Feed file at {}", output_dir / "hackernews.rss.json")
+
+    # Generate markdown file
+    md_content = items_to_markdown(items)
+    _ = (output_dir / "hackernews.md").write_text(md_content, encoding="utf-8")
+    logger.info("Generated markdown file at {}", output_dir / "hackernews.md")
+
+    # Generate JSON file
+    _ = (output_dir / "hackernews.json").write_bytes(items_to_raw_json_bytes(items))
+    logger.info("Generated JSON file at {}", output_dir / "hackernews.json")
+
+
+async def run_pipeline(
+    *,
+    store: ItemStore,
+    crawler: HackerNewsCrawler,
+    count: int,
+    output_dir: Path,
+    enable_llm: bool,
+    perspective_generator: PerspectiveGenerator | None = None,
+    timer: StageTimer | None = None,
+) -> list[Item]:
+    timer = timer or StageTimer()
 
     # Clean up old items
-    await store.cleanup()
+    with timer.stage("cleanup"):
+        await store.cleanup()
 
     now = datetime.now(tz=UTC)
 
     # Fetch stories
     logger.info("Fetching stories from Hacker News...")
-    crawler = HackerNewsCrawler(content_fetcher=ContentFetcher())
-    top_n = os.getenv("HN_COUNT", 30)
-    fetched = await crawler.fetch_top_stories(cache_db_path=db_path, count=int(top_n))
+    with timer.stage("crawl"):
+        fetched = await crawler.fetch_top_stories(
+            cache_db_path=str(store.path),
+            count=count,
+            known_ids=await store.known_ids(),
+            known_urls=await store.known_urls(),
+        )
 
     # Reconcile with cached Items
     logger.info("Reconciling with cached Items...")
-    items = await store.reconcile(now=now, fetched=fetched)
+    with timer.stage("reconcile"):
+        items = await store.reconcile(now=now, fetched=fetched)
 
     # Apply Perspectives only when LLM generation is enabled
-    items = await apply_perspectives(items=items, enabled=enable_llm)
-    for item in items:
-        await store.save(item=item)
+    with timer.stage("transform"):
+        items = await apply_perspectives(
+            items=items,
+            enabled=enable_llm,
+            perspective_generator=perspective_generator,
+            cache_path=store.path,
+        )
+
+    with timer.stage("save"):
+        await store.save_many(items)
     logger.info("Prepared {} Items", len(items))
 
     # Generate output files
     logger.info("Generating output files...")
-    os.makedirs("cache", exist_ok=True)
+    with timer.stage("export"):
+        write_outputs(items, output_dir)
 
-    # Generate JSON Feed file
-    json_feed = items_to_json_feed(items, identity=HACKER_NEWS_FEED, skip_none_perspective=True)
-    with open("cache/hackernews.rss.json", "w", encoding="utf-8") as f:
-        json.dump(json_feed, f, indent=2, ensure_ascii=False)
-    logger.info("Generated JSON Feed file at cache/hackernews.rss.json")
+    logger.info("Stage timings: {}", ", ".join(f"{name} {seconds:.2f}s" for name, seconds in timer.seconds.items()))
+    return items
 
-    # Generate markdown file
-    md_content = items_to_markdown(items)
-    with open("cache/hackernews.md", "w", encoding="utf-8") as f:
-        _ = f.write(md_content)
-    logger.info("Generated markdown file at cache/hackernews.md")
 
-    # Generate JSON file
-    json_content = items_to_raw_json(items)
-    with open("cache/hackernews.json", "w", encoding="utf-8") as f:
-        json.dump(json_content, f, indent=2, ensure_ascii=False)
-    logger.info("Generated JSON file at cache/hackernews.json")
+async def main():
+    _ = dotenv.load_dotenv()
+    enable_llm = llm_enabled()
+
+    db_path = "cache/social.sqlite"
+    circuit_breaker = HostCircuitBreaker(path=db_path)
+    await circuit_breaker.load()
+    content_fetcher = ContentFetcher(
+        extraction_workers=int(os.getenv("CONTENT_EXTRACTION_WORKERS", "0")) or None,
+        circuit_breaker=circuit_breaker,
+        deadline=float(os.getenv("CONTENT_FETCH_DEADLINE", "30")),
+        hedge_after=int(hedge_after_ms) / 1000 if (hedge_after_ms := os.getenv("CONTENT_HEDGE_AFTER_MS")) else None,
+        max_body_bytes=int(os.getenv("CONTENT_MAX_BODY_BYTES", str(5 * 1024 * 1024))),
+    )
+    crawler = HackerNewsCrawler(
+        content_fetcher=content_fetcher,
+        fetch_concurrency=int(os.getenv("HN_FETCH_CONCURRENCY", "8")),
+    )
+
+    retention = RetentionPolicy(
+        max_age=timedelta(days=int(os.getenv("CACHE_RETENTION_DAYS", "180"))),
+        max_bytes=int(max_mb) * 1024 * 1024 if (max_mb := os.getenv("CACHE_MAX_MB")) else None,
+    )
+    # One ItemStore connection serves the whole run
+    async with ItemStore(path=db_path, retention=retention) as store:
+        await run_pipeline(
+            store=store,
+            crawler=crawler,
+            count=int(os.getenv("HN_COUNT", "30")),
+            output_dir=Path("cache"),
+            enable_llm=enable_llm,
+        )
+
+    await circuit_breaker.save()
+    circuit_breaker.log_costliest()
+    logger.info(
+        "Skipped {} non-HTML articles and truncated {} oversized ones",
+        len(content_fetcher.stats.skipped_urls),
+        len(content_fetcher.stats.truncated_urls),
+    )
 
 
 if __name__ == "__main__":
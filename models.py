@@ -41,4 +41,18 @@ class Item(BaseModel):
 
     # AI generated fields
     generated_at_comment_count: Annotated[int | None, Field(description="Comment count when AI generated")] = None
+    generated_from_comments: Annotated[
+        list[str] | None,
+        Field(description="Fingerprints of the comments the Perspective was generated from", exclude=True),
+    ] = None
+    ai_perspective: Perspective | None = None
+
+
+class ItemSummary(BaseModel):
+    # The fields digests and reports need, read without article bodies or comments.
+    id: str
+    title: str
+    url: str
+    updated_at: datetime
+    comment_count: int
     ai_perspective: Perspective | None = None
@@ -0,0 +1,109 @@
+import hashlib
+from collections.abc import Callable
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+from types import TracebackType
+from typing import Self
+
+import aiosqlite
+from json_codec import decode_perspective, encode_json, encode_perspective
+from loguru import logger
+from models import Perspective
+
+PERSPECTIVE_CACHE_TABLE_NAME = "perspective_cache"
+
+CREATE_TABLE_SQL = (
+    f"""
+    CREATE TABLE IF NOT EXISTS {PERSPECTIVE_CACHE_TABLE_NAME} (
+        fingerprint TEXT PRIMARY KEY,
+        model TEXT NOT NULL,
+        response TEXT NOT NULL,
+        perspective TEXT NOT NULL,
+        created_at TEXT NOT NULL
+    )
+    """,
+    f"""
+    CREATE INDEX IF NOT EXISTS idx_{PERSPECTIVE_CACHE_TABLE_NAME}_created_at
+    ON {PERSPECTIVE_CACHE_TABLE_NAME}(created_at)
+    """,
+)
+
+
+def prompt_fingerprint(model: str, system_prompt: str, prompt: str) -> str:
+    # Encoded as a JSON array so no choice of separator can make two different requests hash the same.
+    return hashlib.sha256(encode_json([model, system_prompt, prompt])).hexdigest()
+
+
+class PerspectiveCache:
+    def __init__(
+        self,
+        path: str | Path,
+        *,
+        ttl: timedelta = timedelta(days=30),
+        clock: Callable[[], datetime] | None = None,
+    ) -> None:
+        if ttl <= timedelta(0):
+            raise ValueError("ttl must be positive")
+        self.path = Path(path)
+        self._ttl = ttl
+        self._clock = clock or (lambda: datetime.now(UTC))
+        self._connection: aiosqlite.Connection | None = None
+
+    async def __aenter__(self) -> Self:
+        self._connection = await aiosqlite.connect(self.path)
+        for statement in CREATE_TABLE_SQL:
+            await self._connection.execute(statement)
+        await self._connection.commit()
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        connection, self._connection = self._connection, None
+        if connection is not None:
+            await connection.close()
+
+    async def get(self, fingerprint: str) -> Perspective | None:
+        cutoff = self._clock() - self._ttl
+        cursor = await self._database.execute(
+            f"SELECT perspective FROM {PERSPECTIVE_CACHE_TABLE_NAME} WHERE fingerprint = ? AND created_at >= ?",
+            (fingerprint, cutoff.isoformat()),
+        )
+        row = await cursor.fetchone()
+        return decode_perspective(row[0]) if row else None
+
+    async def put(self, fingerprint: str, *, model: str, response: str, perspective: Perspective) -> None:
+        # Committed as soon as the response arrives, so a run that dies before saving its Items does not pay again.
+        await self._database.execute(
+            f"""
+            INSERT INTO {PERSPECTIVE_CACHE_TABLE_NAME} (fingerprint, model, response, perspective, created_at)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(fingerprint) DO UPDATE SET
+                model = excluded.model,
+                response = excluded.response,
+                perspective = excluded.perspective,
+                created_at = excluded.created_at
+            """,
+            (fingerprint, model, response, encode_perspective(perspective), self._clock().isoformat()),
+        )
+        await self._database.commit()
+
+    async def expire(self) -> int:
+        cutoff = self._clock() - self._ttl
+        cursor = await self._database.execute(
+            f"DELETE FROM {PERSPECTIVE_CACHE_TABLE_NAME} WHERE created_at < ?",
+            (cutoff.isoformat(),),
+        )
+        await self._database.commit()
+        if cursor.rowcount:
+            logger.info("Expired {} cached Perspective responses older than {} days", cursor.rowcount, self._ttl.days)
+        return cursor.rowcount
+
+    @property
+    def _database(self) -> aiosqlite.Connection:
+        if self._connection is None:
+            raise RuntimeError("PerspectiveCache must be used as an async context manager")
+        return self._connection
@@ -1,12 +1,16 @@
+import hashlib
 import json
 import os
 import re
+import sqlite3
 from collections.abc import Awaitable, Callable
-from typing import Protocol
+from typing import Protocol, runtime_checkable
 
 from httpx import HTTPError
 from loguru import logger
 from models import Comment, Item, Perspective, Viewpoint
+from perspective_cache import PerspectiveCache, prompt_fingerprint
+from prompt_builder import CommentRanking, Prompt, PromptBuilder, estimate_tokens
 from smolllm import LLMResponse, StreamError, ask_llm
 
 MIN_COMMENTS_FOR_PERSPECTIVE = 15
@@ -28,6 +32,38 @@ Repeat <viewpoint> for each distinct viewpoint. The support attribute must be a
 """
 
 
+REFRESH_SYSTEM_PROMPT = """You are an expert social media analyst specializing in community discussion analysis.
+
+You are given your earlier analysis of a discussion and only the comments posted since. Update the analysis: revise the
+summary and sentiment where the new comments shift them, merge new reactions into existing viewpoints or add new ones
+(at most five in total), and re-estimate each viewpoint's support as a percentage of all comments, earlier and new.
+
+Return only these XML tags:
+<title>concise title capturing the main discussion theme</title>
+<summary>one paragraph capturing key discussion points and community reaction</summary>
+<sentiment>positive, mixed, or negative</sentiment>
+<viewpoint support="NN">one consolidated viewpoint</viewpoint>
+
+Repeat <viewpoint> for each distinct viewpoint. The support attribute must be a number from 0 to 100.
+"""
+
+
+BATCH_SYSTEM_PROMPT = """You are an expert social media analyst specializing in community discussion analysis.
+
+You are given several unrelated discussions, each wrapped in <item id="...">...</item>. Analyze each discussion on its
+own: group similar reactions, identify agreement and disagreement, and consolidate at most five distinct viewpoints.
+Estimate the percentage of that discussion's comments supporting each viewpoint and assess its overall sentiment.
+
+For every discussion return one <item id="..."> block with the same id, containing only these XML tags:
+<title>concise title capturing the main discussion theme</title>
+<summary>one paragraph capturing key discussion points and community reaction</summary>
+<sentiment>positive, mixed, or negative</sentiment>
+<viewpoint support="NN">one consolidated viewpoint</viewpoint>
+
+Repeat <viewpoint> for each distinct viewpoint. The support attribute must be a number from 0 to 100.
+"""
+
+
 class PerspectiveGenerationError(RuntimeError):
     """The configured provider failed to produce a valid Perspective."""
 
@@ -36,6 +72,34 @@ class PerspectiveGenerator(Protocol):
     async def generate(self, title: str, comments: list[Comment]) -> Perspective: ...
 
 
+@runtime_checkable
+class RefreshesPerspective(Protocol):
+    async def refresh(
+        self,
+        title: str,
+        perspective: Perspective,
+        new_comments: list[Comment],
+        previous_comment_count: int,
+    ) -> Perspective: ...
+
+
+@runtime_checkable
+class WaitsForRateLimit(Protocol):
+    # Returns a generator that awaits acquire() before each provider request, and only then.
+    def with_rate_limit(self, acquire: Callable[[], Awaitable[None]]) -> PerspectiveGenerator: ...
+
+
+@runtime_checkable
+class GeneratesBatches(Protocol):
+    # Maps item id to (title, comments); Items missing from the result were not answered usably.
+    async def generate_batch(self, discussions: dict[str, tuple[str, list[Comment]]]) -> dict[str, Perspective]: ...
+
+
+def comment_fingerprint(comment: Comment) -> str:
+    # Comments carry no stable id, so author and text identify one across runs.
+    return hashlib.sha256(f"{comment.author}\0{comment.content}".encode()).hexdigest()[:16]
+
+
 def needs_refresh(item: Item) -> bool:
     current_count = len(item.comments)
     if item.generated_at_comment_count is None or current_count == 0:
@@ -84,6 +148,19 @@ def _parse_json_perspective(text: str) -> Perspective:
     return Perspective.model_validate(json.loads(stripped))
 
 
+def perspective_to_xml(perspective: Perspective) -> str:
+    lines = [
+        f"<title>{perspective.title}</title>",
+        f"<summary>{perspective.summary}</summary>",
+        f"<sentiment>{perspective.sentiment}</sentiment>",
+    ]
+    lines.extend(
+        f'<viewpoint support="{viewpoint.support_percentage:g}">{viewpoint.statement}</viewpoint>'
+        for viewpoint in perspective.viewpoints
+    )
+    return "\n".join(lines)
+
+
 def parse_perspective(text: str) -> Perspective:
     try:
         if perspective := _parse_xml_perspective(text):
@@ -97,18 +174,42 @@ def parse_perspective(text: str) -> Perspective:
         raise ValueError("Unable to parse Perspective response as XML or fenced JSON") from error
 
 
+def split_item_sections(text: str) -> dict[str, str]:
+    return {
+        item_id: section.strip()
+        for item_id, section in re.findall(r"<item\s+id=[\"']([^\"']+)[\"']\s*>(.*?)</item>", text, re.DOTALL)
+    }
+
+
+def parse_perspectives(text: str) -> dict[str, Perspective]:
+    # A batched response parses per Item: a malformed section drops only its own Item.
+    perspectives: dict[str, Perspective] = {}
+    for item_id, section in split_item_sections(text).items():
+        try:
+            perspectives[item_id] = parse_perspective(section)
+        except ValueError:
+            continue
+    return perspectives
+
+
 class SmolLLMPerspectiveGenerator:
     def __init__(
         self,
         *,
         model: str,
         ask: Callable[..., Awaitable[LLMResponse]] = ask_llm,
+        cache: PerspectiveCache | None = None,
+        prompt_builder: PromptBuilder | None = None,
+        rate_limit: Callable[[], Awaitable[None]] | None = None,
     ) -> None:
         self._model = model
         self._ask = ask
+        self._cache = cache
+        self._prompt_builder = prompt_builder or PromptBuilder()
+        self._rate_limit = rate_limit
 
     @classmethod
-    def from_env(cls) -> "SmolLLMPerspectiveGenerator":
+    def from_env(cls, *, cache: PerspectiveCache | None = None) -> "SmolLLMPerspectiveGenerator":
         model = os.getenv("SMOLLLM_MODEL")
         if not model:
             raise ValueError("SMOLLLM_MODEL is required and must use provider/model form")
@@ -120,16 +221,98 @@ class SmolLLMPerspectiveGenerator:
         api_key_name = f"{provider.upper()}_API_KEY"
         if not os.getenv(api_key_name):
             raise ValueError(f"{api_key_name} is required for {model}")
-        return cls(model=model)
+        prompt_builder = PromptBuilder(
+            max_tokens=int(os.getenv("LLM_PROMPT_MAX_TOKENS", "8000")),
+            ranking=CommentRanking(os.getenv("LLM_COMMENT_RANKING", "diversity")),
+        )
+        return cls(model=model, cache=cache, prompt_builder=prompt_builder)
+
+    def with_rate_limit(self, acquire: Callable[[], Awaitable[None]]) -> "SmolLLMPerspectiveGenerator":
+        return SmolLLMPerspectiveGenerator(
+            model=self._model,
+            ask=self._ask,
+            cache=self._cache,
+            prompt_builder=self._prompt_builder,
+            rate_limit=acquire,
+        )
 
     async def generate(self, title: str, comments: list[Comment]) -> Perspective:
-        comments_text = "\n".join(f"- {comment.author}: {comment.content[:500]}" for comment in comments)
-        prompt = f"Title: {title}\nComments:\n{comments_text}"
+        built = self._prompt_builder.build(title, comments)
+        return await self._ask_for_perspective(title, SYSTEM_PROMPT, built)
+
+    async def refresh(
+        self,
+        title: str,
+        perspective: Perspective,
+        new_comments: list[Comment],
+        previous_comment_count: int,
+    ) -> Perspective:
+        context = f"Earlier analysis of {previous_comment_count} comments:\n{perspective_to_xml(perspective)}\n"
+        built = self._prompt_builder.build(title, new_comments, context=context, comments_label="New comments")
+        return await self._ask_for_perspective(title, REFRESH_SYSTEM_PROMPT, built)
+
+    async def generate_batch(self, discussions: dict[str, tuple[str, list[Comment]]]) -> dict[str, Perspective]:
+        # Each Item keeps the prompt it would have on its own, and Items join the request while it stays within the
+        # prompt budget. Those that do not fit are left out of the result, so the caller generates them one by one.
+        perspectives: dict[str, Perspective] = {}
+        pending: dict[str, tuple[str, str]] = {}
+        used_tokens = 0
+        for item_id, (title, comments) in discussions.items():
+            prompt = self._prompt_builder.build(title, comments).text
+            # Keyed on the system prompt that produced the answer, so it only stands in for the same batched Item.
+            fingerprint = prompt_fingerprint(self._model, BATCH_SYSTEM_PROMPT, prompt)
+            if (cached := await self._cached(fingerprint)) is not None:
+                perspectives[item_id] = cached
+                continue
+            section = f'<item id="{item_id}">\n{prompt}\n</item>'
+            if pending and used_tokens + estimate_tokens(section) > self._prompt_builder.max_tokens:
+                continue
+            pending[item_id] = (section, fingerprint)
+            used_tokens += estimate_tokens(section)
+        if not pending:
+            return perspectives
+
+        logger.info("Generating {} Perspectives in one request", len(pending))
+        batch_prompt = "\n\n".join(section for section, _ in pending.values())
+        try:
+            await self._wait_for_rate_limit()
+            response = await self._ask(
+                batch_prompt,
+                system_prompt=BATCH_SYSTEM_PROMPT,
+                model=self._model,
+                stream=False,
+            )
+        except (HTTPError, StreamError, TimeoutError, TypeError, ValueError) as error:
+            raise PerspectiveGenerationError(f"Failed to generate {len(pending)} batched Perspectives") from error
+
+        sections = split_item_sections(response.text)
+        for item_id, perspective in parse_perspectives(response.text).items():
+            if item_id not in pending:
+                continue
+            perspectives[item_id] = perspective
+            await self._store(pending[item_id][1], sections[item_id], perspective)
+        return perspectives
+
+    async def _ask_for_perspective(self, title: str, system_prompt: str, built: Prompt) -> Perspective:
+        if built.dropped_count:
+            logger.info(
+                "Prompt for {!r} keeps {} of {} comments within ~{} tokens",
+                title,
+                built.included_count,
+                built.included_count + built.dropped_count,
+                built.estimated_tokens,
+            )
+        fingerprint = prompt_fingerprint(self._model, system_prompt, built.text)
+        if (cached := await self._cached(fingerprint)) is not None:
+            logger.info("Using cached Perspective response for {!r}", title)
+            return cached
+
         logger.info("Generating Perspective for {!r}", title)
         try:
+            await self._wait_for_rate_limit()
             response = await self._ask(
-                prompt,
-                system_prompt=SYSTEM_PROMPT,
+                built.text,
+                system_prompt=system_prompt,
                 model=self._model,
                 stream=False,
             )
@@ -137,6 +320,31 @@ class SmolLLMPerspectiveGenerator:
             raise PerspectiveGenerationError(f"Failed to generate Perspective for {title!r}") from error
 
         try:
-            return parse_perspective(response.text)
+            perspective = parse_perspective(response.text)
         except ValueError as error:
             raise PerspectiveGenerationError(f"Failed to generate Perspective for {title!r}") from error
+        # Only parsed responses are cached, so an unusable one is asked for again next time.
+        await self._store(fingerprint, response.text, perspective)
+        return perspective
+
+    async def _wait_for_rate_limit(self) -> None:
+        if self._rate_limit is not None:
+            await self._rate_limit()
+
+    async def _cached(self, fingerprint: str) -> Perspective | None:
+        if self._cache is None:
+            return None
+        try:
+            return await self._cache.get(fingerprint)
+        except sqlite3.Error as error:
+            logger.warning("Perspective cache lookup failed: {}", error)
+            return None
+
+    async def _store(self, fingerprint: str, response: str, perspective: Perspective) -> None:
+        # The cache only saves repeat requests, so failing to write it must not lose the Perspective just paid for.
+        if self._cache is None:
+            return
+        try:
+            await self._cache.put(fingerprint, model=self._model, response=response, perspective=perspective)
+        except sqlite3.Error as error:
+            logger.warning("Failed to cache Perspective response: {}", error)
@@ -0,0 +1,90 @@
+import math
+from dataclasses import dataclass
+from enum import StrEnum
+
+from models import Comment
+
+# Roughly four characters per token for English text with common tokenizers; close enough to bound a request.
+CHARS_PER_TOKEN = 4
+COMMENT_MAX_CHARS = 500
+
+
+class CommentRanking(StrEnum):
+    # The order the source returned, which for Hacker News is its own ranking.
+    ORIGINAL = "original"
+    LENGTH = "length"
+    # One comment per author in turn, skipping repeated text, so a few prolific authors cannot fill the budget.
+    DIVERSITY = "diversity"
+
+
+@dataclass(frozen=True, slots=True)
+class Prompt:
+    text: str
+    included_count: int
+    dropped_count: int
+    estimated_tokens: int
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def _comment_line(comment: Comment) -> str:
+    return f"- {comment.author}: {comment.content[:COMMENT_MAX_CHARS]}"
+
+
+def _rank(comments: list[Comment], ranking: CommentRanking) -> list[int]:
+    positions = list(range(len(comments)))
+    if ranking is CommentRanking.LENGTH:
+        return sorted(positions, key=lambda position: -len(comments[position].content[:COMMENT_MAX_CHARS]))
+    if ranking is CommentRanking.ORIGINAL:
+        return positions
+
+    rounds: dict[str, int] = {}
+    seen_text: set[str] = set()
+    ranked: list[tuple[int, int]] = []
+    for position, comment in enumerate(comments):
+        text = " ".join(comment.content[:COMMENT_MAX_CHARS].lower().split())
+        if text in seen_text:
+            continue
+        seen_text.add(text)
+        ranked.append((rounds.get(comment.author, 0), position))
+        rounds[comment.author] = rounds.get(comment.author, 0) + 1
+    return [position for _, position in sorted(ranked)]
+
+
+@dataclass(frozen=True, slots=True)
+class PromptBuilder:
+    max_tokens: int = 8000
+    ranking: CommentRanking = CommentRanking.DIVERSITY
+
+    def __post_init__(self) -> None:
+        if self.max_tokens < 1:
+            raise ValueError("max_tokens must be at least 1")
+
+    def build(
+        self,
+        title: str,
+        comments: list[Comment],
+        *,
+        context: str = "",
+        comments_label: str = "Comments",
+    ) -> Prompt:
+        # context goes between the title and the comments and always counts against the budget.
+        header = f"Title: {title}\n{context}{comments_label}:\n"
+        lines = [_comment_line(comment) for comment in comments]
+        text = header + "\n".join(lines)
+        if estimate_tokens(text) <= self.max_tokens:
+            return Prompt(text, len(comments), 0, estimate_tokens(text))
+
+        # Fill the budget in ranked order, then render the chosen comments in thread order.
+        used_chars = len(header)
+        budget_chars = self.max_tokens * CHARS_PER_TOKEN
+        included: set[int] = set()
+        for position in _rank(comments, self.ranking):
+            line_chars = len(lines[position]) + (1 if included else 0)
+            if used_chars + line_chars <= budget_chars:
+                included.add(position)
+                used_chars += line_chars
+        text = header + "\n".join(lines[position] for position in sorted(included))
+        return Prompt(text, len(included), len(comments) - len(included), estimate_tokens(text))
@@ -0,0 +1,42 @@
+import argparse
+import asyncio
+import sys
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+
+from item_store import ItemStore
+from loguru import logger
+
+
+async def search(database: Path, query: str, *, days: int | None, limit: int) -> None:
+    since = datetime.now(UTC) - timedelta(days=days) if days else None
+    async with ItemStore(database) as store:
+        summaries = await store.search(query, since=since, limit=limit)
+
+    for summary in summaries:
+        perspective = f" — {summary.ai_perspective.title}" if summary.ai_perspective else ""
+        print(f"{summary.updated_at:%Y-%m-%d}  {summary.title} ({summary.comment_count} comments){perspective}")
+        print(f"            {summary.url}")
+    if not summaries:
+        print(f"No stored Items match {query!r}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Search stored Items by title, article text, comments and Perspective."
+    )
+    parser.add_argument("query", nargs="+", help="words that must all appear; matched by stem, so rust matches Rust's")
+    parser.add_argument("--days", type=int, help="only Items updated within this many days")
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--db", type=Path, default=Path("cache/social.sqlite"))
+    args = parser.parse_args()
+    if not args.db.exists():
+        parser.error(f"{args.db} does not exist; run make download_db first")
+
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+    asyncio.run(search(args.db, " ".join(args.query), days=args.days, limit=args.limit))
+
+
+if __name__ == "__main__":
+    main()
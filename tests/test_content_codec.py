@@ -0,0 +1,32 @@
+import pytest
+from content_codec import COMPRESS_MIN_BYTES, ZLIB_CODEC, ZLIB_HTML_CODEC, compress_text, decompress_text
+
+
+def test_large_text_round_trips_through_its_codec() -> None:
+    text = "Plain article text with ünïcode. " * 100
+    html = "<p>Article paragraph with <strong>markup</strong>.</p>\n    " * 100
+
+    compressed_text = compress_text(text)
+    compressed_html = compress_text(html, html=True)
+
+    assert isinstance(compressed_text, bytes) and compressed_text[0] == ZLIB_CODEC
+    assert isinstance(compressed_html, bytes) and compressed_html[0] == ZLIB_HTML_CODEC
+    assert len(compressed_html) < len(html) // 10
+    assert decompress_text(compressed_text) == text
+    assert decompress_text(compressed_html) == html
+
+
+def test_small_or_incompressible_values_stay_plain_text() -> None:
+    short = "x" * (COMPRESS_MIN_BYTES - 1)
+    random_looking = bytes(range(256)).hex()[: COMPRESS_MIN_BYTES * 2]
+
+    assert compress_text(None) is None
+    assert compress_text(short) == short
+    assert decompress_text(short) == short
+    assert decompress_text(None) is None
+    assert decompress_text(compress_text(random_looking)) == random_looking
+
+
+def test_unknown_codec_is_rejected() -> None:
+    with pytest.raises(ValueError):
+        decompress_text(b"\xffnot a known codec")
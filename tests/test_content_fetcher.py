@@ -2,12 +2,41 @@ import asyncio
 import threading
 from collections.abc import Callable
 
+import httpx
 import pytest
-import requests
-from content_fetcher import ContentFetcher
+from content_fetcher import (
+    ContentFetcher,
+    Document,
+    extract_with_beautifulsoup,
+    extract_with_trafilatura,
+)
+from host_health import HostCircuitBreaker, Route
 
 FetchResult = tuple[str | None, str | None]
 
+ARTICLE_URL = "https://example.test/article"
+JINA_URL = f"https://r.jina.ai/{ARTICLE_URL}"
+
+
+def offline_document(url: str = ARTICLE_URL, content: bytes = b"<html></html>") -> Document:
+    return Document(url=url, status_code=200, headers={"content-type": "text/html"}, content=content)
+
+
+def serve(routes: dict[str, httpx.Response], requested: list[str] | None = None) -> httpx.MockTransport:
+    def handler(request: httpx.Request) -> httpx.Response:
+        if requested is not None:
+            requested.append(str(request.url))
+        if str(request.url) in routes:
+            return routes[str(request.url)]
+        raise httpx.ConnectError("unreachable in offline tests", request=request)
+
+    return httpx.MockTransport(handler)
+
+
+async def fetch_once(fetcher: ContentFetcher, url: str = ARTICLE_URL) -> FetchResult:
+    async with fetcher:
+        return await fetcher.fetch(url)
+
 
 @pytest.mark.parametrize(
     ("successful_tier", "expected_calls", "expected"),
@@ -20,62 +49,386 @@ FetchResult = tuple[str | None, str | None]
         ),
         (
             "jina",
-            ["trafilatura", "beautifulsoup", "jina"],
+            ["trafilatura", "beautifulsoup"],
             ("text-3", None),
         ),
-        (None, ["trafilatura", "beautifulsoup", "jina"], (None, None)),
+        (None, ["trafilatura", "beautifulsoup"], (None, None)),
     ],
 )
-def test_fallback_chain_stops_at_the_first_successful_tier(
+def test_fallback_chain_downloads_once_and_stops_at_the_first_successful_tier(
     successful_tier: str | None,
     expected_calls: list[str],
     expected: FetchResult,
 ) -> None:
     calls: list[str] = []
+    requested: list[str] = []
 
-    def extractor(name: str, result: FetchResult) -> Callable[[str], FetchResult]:
-        def fetch(url: str) -> FetchResult:
-            assert url == "https://example.test/article"
+    def extractor(name: str, result: FetchResult) -> Callable[[Document], FetchResult]:
+        def extract(document: Document) -> FetchResult:
+            assert document.url == ARTICLE_URL
+            assert document.content == b"<html>saved page</html>"
             calls.append(name)
-            if successful_tier == name:
-                return result
-            if name == "beautifulsoup":
-                raise requests.RequestException("request failure falls through")
-            return None, None
+            return result if successful_tier == name else (None, None)
 
-        return fetch
+        return extract
 
+    routes = {ARTICLE_URL: httpx.Response(200, content=b"<html>saved page</html>")}
+    routes[JINA_URL] = httpx.Response(200, text="text-3") if successful_tier == "jina" else httpx.Response(503)
     fetcher = ContentFetcher(
+        transport=serve(routes, requested),
         extractors=(
             ("trafilatura", extractor("trafilatura", ("text-1", "<p>html-1</p>"))),
             ("beautifulsoup", extractor("beautifulsoup", ("text-2", "<p>html-2</p>"))),
-            ("jina", extractor("jina", ("text-3", None))),
-        )
+        ),
     )
 
-    assert asyncio.run(fetcher.fetch("https://example.test/article")) == expected
+    assert asyncio.run(fetch_once(fetcher)) == expected
     assert calls == expected_calls
+    assert requested == (
+        [ARTICLE_URL] if successful_tier in {"trafilatura", "beautifulsoup"} else [ARTICLE_URL, JINA_URL]
+    )
+
+
+def test_failed_download_goes_straight_to_the_fallback() -> None:
+    def unreachable_extractor(document: Document) -> FetchResult:
+        raise AssertionError("local extractors need a downloaded document")
+
+    fetcher = ContentFetcher(
+        transport=serve({ARTICLE_URL: httpx.Response(403), JINA_URL: httpx.Response(200, text="reader view")}),
+        extractors=(("local", unreachable_extractor),),
+    )
+
+    assert asyncio.run(fetch_once(fetcher)) == ("reader view", None)
+
+
+def test_beautifulsoup_extractor_is_a_pure_function_of_the_saved_page() -> None:
+    page = "<html><body><nav>Menu</nav><article><p>Saved café article</p></article></body></html>"
+
+    text, html = extract_with_beautifulsoup(offline_document(content=page.encode()))
+
+    assert text == "Saved café article"
+    assert html == "<article><p>Saved café article</p></article>"
+
+
+def test_trafilatura_extractor_renders_text_and_unwrapped_html_from_one_extraction() -> None:
+    paragraphs = "".join(
+        f"<p>Paragraph {index} explains the offline extraction path in enough detail to count as content.</p>"
+        for index in range(8)
+    )
+    table = "<table><tr><td>Tier</td><td>Cost</td></tr></table>"
+    page = f"<html><body><nav>Menu</nav><article><h1>Saved article</h1>{paragraphs}{table}</article></body></html>"
+
+    text, html = extract_with_trafilatura(offline_document(content=page.encode()))
+
+    assert text is not None
+    assert text.startswith("Saved article\nParagraph 0 explains")
+    assert "Menu" not in text
+    assert html is not None
+    assert html.startswith("<h1>Saved article</h1>")
+    assert html.endswith("count as content.</p>\n<table>\n<tr>\n<td>Tier</td>\n<td>Cost</td>\n</tr>\n</table>")
+    assert "<body" not in html
 
 
 def test_unexpected_extractor_error_fails_fast() -> None:
-    def broken_extractor(url: str) -> FetchResult:
-        raise RuntimeError(f"programming error while fetching {url}")
+    def broken_extractor(document: Document) -> FetchResult:
+        raise RuntimeError(f"programming error while extracting {document.url}")
 
-    fetcher = ContentFetcher(extractors=(("broken", broken_extractor),))
+    fetcher = ContentFetcher(
+        transport=serve({ARTICLE_URL: httpx.Response(200, content=b"<html></html>")}),
+        extractors=(("broken", broken_extractor),),
+    )
 
     with pytest.raises(RuntimeError, match="programming error"):
-        asyncio.run(fetcher.fetch("https://example.test/article"))
+        asyncio.run(fetch_once(fetcher))
 
 
-def test_fetch_runs_the_synchronous_chain_off_the_event_loop() -> None:
+def test_fetch_runs_extraction_off_the_event_loop() -> None:
     event_loop_thread = threading.get_ident()
 
-    def record_thread(url: str) -> FetchResult:
+    def record_thread(document: Document) -> FetchResult:
         return str(threading.get_ident()), None
 
-    fetcher = ContentFetcher(extractors=(("thread-probe", record_thread),))
+    fetcher = ContentFetcher(
+        transport=serve({ARTICLE_URL: httpx.Response(200, content=b"<html></html>")}),
+        extractors=(("thread-probe", record_thread),),
+    )
 
-    worker_thread, _ = asyncio.run(fetcher.fetch("https://example.test/article"))
+    worker_thread, _ = asyncio.run(fetch_once(fetcher))
 
     assert worker_thread is not None
     assert int(worker_thread) != event_loop_thread
+
+
+def test_process_pool_extraction_matches_in_thread_extraction() -> None:
+    pages = {
+        f"https://example.test/{index}": f"<html><main><p>Article {index}</p></main></html>".encode()
+        for index in range(4)
+    }
+
+    async def scenario(extraction_workers: int | None) -> list[FetchResult]:
+        routes = {url: httpx.Response(200, content=page) for url, page in pages.items()}
+        async with ContentFetcher(
+            transport=serve(routes),
+            extractors=(("BeautifulSoup", extract_with_beautifulsoup),),
+            extraction_workers=extraction_workers,
+        ) as fetcher:
+            return await asyncio.gather(*(fetcher.fetch(url) for url in pages))
+
+    in_processes = asyncio.run(scenario(extraction_workers=2))
+
+    assert in_processes == asyncio.run(scenario(extraction_workers=None))
+    assert in_processes[3] == ("Article 3", "<main><p>Article 3</p></main>")
+
+
+def test_fetcher_limits_connections_per_host_on_one_shared_client() -> None:
+    in_flight: dict[str, int] = {}
+    peak: dict[str, int] = {}
+
+    class SlowTransport(httpx.AsyncBaseTransport):
+        async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+            host = request.url.host
+            in_flight[host] = in_flight.get(host, 0) + 1
+            peak[host] = max(peak.get(host, 0), in_flight[host])
+            await asyncio.sleep(0.01)
+            in_flight[host] -= 1
+            return httpx.Response(200, content=b"<html><article>Pooled</article></html>")
+
+    async def scenario() -> list[FetchResult]:
+        async with ContentFetcher(
+            max_connections_per_host=2,
+            transport=SlowTransport(),
+            extractors=(("BeautifulSoup", extract_with_beautifulsoup),),
+        ) as fetcher:
+            urls = [f"https://{host}.test/{index}" for host in ("busy", "quiet") for index in range(5)]
+            return await asyncio.gather(*(fetcher.fetch(url) for url in urls))
+
+    results = asyncio.run(scenario())
+
+    assert [text for text, _ in results] == ["Pooled"] * 10
+    assert peak == {"busy.test": 2, "quiet.test": 2}
+
+
+def test_fetch_requires_the_client_lifecycle() -> None:
+    with pytest.raises(RuntimeError, match="async context manager"):
+        asyncio.run(ContentFetcher().fetch(ARTICLE_URL))
+
+
+def test_open_circuit_skips_direct_download_for_a_failing_host(tmp_path) -> None:
+    requested: list[str] = []
+    breaker = HostCircuitBreaker(tmp_path / "hosts.sqlite", failure_threshold=1)
+    fetcher = ContentFetcher(
+        transport=serve(
+            {ARTICLE_URL: httpx.Response(403), JINA_URL: httpx.Response(200, text="reader view")}, requested
+        ),
+        circuit_breaker=breaker,
+    )
+
+    async def scenario() -> list[FetchResult]:
+        async with fetcher:
+            return [await fetcher.fetch(ARTICLE_URL), await fetcher.fetch(ARTICLE_URL)]
+
+    assert asyncio.run(scenario()) == [("reader view", None), ("reader view", None)]
+    assert requested == [ARTICLE_URL, JINA_URL, JINA_URL]
+    assert breaker.records["example.test"].fetch_count == 2
+
+
+class DelayedTransport(httpx.AsyncBaseTransport):
+    def __init__(self, routes: dict[str, tuple[float, httpx.Response]]) -> None:
+        self._routes = routes
+        self.requested: list[str] = []
+        self.cancelled: list[str] = []
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        url = str(request.url)
+        self.requested.append(url)
+        delay, response = self._routes[url]
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            self.cancelled.append(url)
+            raise
+        return response
+
+
+ARTICLE_PAGE = b"<html><article>Direct article</article></html>"
+
+
+@pytest.mark.parametrize(
+    ("article_delay", "expected", "expected_requests", "expected_cancelled"),
+    [
+        (0, ("Direct article", "<article>Direct article</article>"), [ARTICLE_URL], []),
+        (5, ("reader view", None), [ARTICLE_URL, JINA_URL], [ARTICLE_URL]),
+    ],
+)
+def test_hedging_races_the_fallback_against_a_slow_direct_fetch(
+    article_delay: float,
+    expected: FetchResult,
+    expected_requests: list[str],
+    expected_cancelled: list[str],
+) -> None:
+    transport = DelayedTransport(
+        {
+            ARTICLE_URL: (article_delay, httpx.Response(200, content=ARTICLE_PAGE)),
+            JINA_URL: (0, httpx.Response(200, text="reader view")),
+        }
+    )
+    fetcher = ContentFetcher(
+        transport=transport,
+        extractors=(("BeautifulSoup", extract_with_beautifulsoup),),
+        hedge_after=0.05,
+    )
+
+    assert asyncio.run(fetch_once(fetcher)) == expected
+    assert transport.requested == expected_requests
+    assert transport.cancelled == expected_cancelled
+
+
+def test_losing_the_hedge_race_does_not_count_against_a_slow_host(tmp_path) -> None:
+    transport = DelayedTransport(
+        {
+            ARTICLE_URL: (5, httpx.Response(200, content=ARTICLE_PAGE)),
+            JINA_URL: (0, httpx.Response(200, text="reader view")),
+        }
+    )
+    breaker = HostCircuitBreaker(tmp_path / "hosts.sqlite", failure_threshold=1)
+    fetcher = ContentFetcher(
+        transport=transport,
+        extractors=(("BeautifulSoup", extract_with_beautifulsoup),),
+        circuit_breaker=breaker,
+        hedge_after=0.05,
+    )
+
+    assert asyncio.run(fetch_once(fetcher)) == ("reader view", None)
+    record = breaker.records["example.test"]
+    assert (record.consecutive_failures, record.open_until) == (0, None)
+    assert breaker.route(ARTICLE_URL) is Route.DIRECT
+
+
+def test_a_non_html_body_mid_race_waits_for_the_hedge_already_in_flight(tmp_path) -> None:
+    transport = DelayedTransport(
+        {
+            ARTICLE_URL: (0.1, httpx.Response(200, headers={"content-type": "application/pdf"}, content=b"%PDF-1.7")),
+            JINA_URL: (0.2, httpx.Response(200, text="reader view")),
+        }
+    )
+    breaker = HostCircuitBreaker(tmp_path / "hosts.sqlite", failure_threshold=1)
+    fetcher = ContentFetcher(
+        transport=transport,
+        extractors=(("BeautifulSoup", extract_with_beautifulsoup),),
+        circuit_breaker=breaker,
+        hedge_after=0.05,
+    )
+
+    assert asyncio.run(fetch_once(fetcher)) == ("reader view", None)
+    assert transport.requested == [ARTICLE_URL, JINA_URL]
+    assert transport.cancelled == []
+    assert fetcher.stats.skipped_urls == [ARTICLE_URL]
+    assert breaker.records["example.test"].consecutive_failures == 0
+
+
+def test_deadline_bounds_the_whole_fallback_chain_and_counts_as_a_direct_failure(tmp_path) -> None:
+    transport = DelayedTransport(
+        {
+            ARTICLE_URL: (0, httpx.Response(200, content=b"<html>no article here</html>")),
+            JINA_URL: (5, httpx.Response(200, text="too late")),
+        }
+    )
+    breaker = HostCircuitBreaker(tmp_path / "hosts.sqlite")
+    fetcher = ContentFetcher(
+        transport=transport,
+        extractors=(("BeautifulSoup", extract_with_beautifulsoup),),
+        circuit_breaker=breaker,
+        deadline=0.1,
+    )
+
+    assert asyncio.run(fetch_once(fetcher)) == (None, None)
+    assert transport.cancelled == [JINA_URL]
+    assert breaker.records["example.test"].consecutive_failures == 1
+    assert breaker.records["example.test"].total_seconds < 1
+
+
+@pytest.mark.parametrize(
+    ("response", "expected", "expected_requests"),
+    [
+        (
+            httpx.Response(200, headers={"content-type": "application/pdf"}, content=b"%PDF-1.7"),
+            ("reader view", None),
+            [ARTICLE_URL, JINA_URL],
+        ),
+        (
+            httpx.Response(200, headers={"content-type": "text/html"}, content=b"%PDF-1.7 mislabelled"),
+            ("reader view", None),
+            [ARTICLE_URL, JINA_URL],
+        ),
+        (
+            httpx.Response(200, headers={"content-type": "video/mp4"}, content=b"\x00\x00\x00\x18ftypmp42"),
+            (None, None),
+            [ARTICLE_URL],
+        ),
+        (
+            httpx.Response(200, content=b"\x00\x00\x00\x18ftypmp42"),
+            (None, None),
+            [ARTICLE_URL],
+        ),
+    ],
+)
+def test_non_html_bodies_skip_local_extraction(
+    response: httpx.Response,
+    expected: FetchResult,
+    expected_requests: list[str],
+) -> None:
+    def unreachable_extractor(document: Document) -> FetchResult:
+        raise AssertionError("non-HTML bodies never reach the HTML extractors")
+
+    requested: list[str] = []
+    fetcher = ContentFetcher(
+        transport=serve({ARTICLE_URL: response, JINA_URL: httpx.Response(200, text="reader view")}, requested),
+        extractors=(("local", unreachable_extractor),),
+    )
+
+    assert asyncio.run(fetch_once(fetcher)) == expected
+    assert requested == expected_requests
+    assert fetcher.stats.skipped_urls == [ARTICLE_URL]
+
+
+def test_download_stops_reading_at_the_byte_cap() -> None:
+    received: list[Document] = []
+
+    def record(document: Document) -> FetchResult:
+        received.append(document)
+        return "kept", None
+
+    page = b"<html><article>" + b"x" * 1000 + b"</article></html>"
+    fetcher = ContentFetcher(
+        transport=serve({ARTICLE_URL: httpx.Response(200, content=page)}),
+        extractors=(("record", record),),
+        max_body_bytes=100,
+    )
+
+    assert asyncio.run(fetch_once(fetcher)) == ("kept", None)
+    assert received[0].content == page[:100]
+    assert received[0].truncated is True
+    assert fetcher.stats.truncated_urls == [ARTICLE_URL]
+
+
+def test_malformed_urls_are_skipped_without_failing_their_neighbours(tmp_path) -> None:
+    requested: list[str] = []
+    breaker = HostCircuitBreaker(tmp_path / "hosts.sqlite")
+    fetcher = ContentFetcher(
+        transport=serve({ARTICLE_URL: httpx.Response(200, content=ARTICLE_PAGE)}, requested),
+        extractors=(("BeautifulSoup", extract_with_beautifulsoup),),
+        circuit_breaker=breaker,
+    )
+    urls = ["https://example.test/\x00", "http://[bad/", ARTICLE_URL]
+
+    async def scenario() -> list[FetchResult]:
+        async with fetcher:
+            return await asyncio.gather(*(fetcher.fetch(url) for url in urls))
+
+    assert asyncio.run(scenario()) == [
+        (None, None),
+        (None, None),
+        ("Direct article", "<article>Direct article</article>"),
+    ]
+    assert requested == [ARTICLE_URL]
+    assert list(breaker.records) == ["example.test"]
@@ -5,8 +5,9 @@ from exporter import (
     items_to_json_feed,
     items_to_markdown,
     items_to_raw_json,
+    summaries_to_markdown,
 )
-from models import Comment, Item, Perspective, Viewpoint
+from models import Comment, Item, ItemSummary, Perspective, Viewpoint
 
 
 def fixture_items() -> list[Item]:
@@ -201,3 +202,20 @@ def test_raw_json_snapshot() -> None:
         },
     }
     assert raw_items[1]["ai_perspective"] is None
+
+
+def test_summaries_render_the_same_markdown_as_full_items() -> None:
+    items = fixture_items()
+    summaries = [
+        ItemSummary(
+            id=item.id,
+            title=item.title,
+            url=item.url,
+            updated_at=item.updated_at,
+            comment_count=len(item.comments),
+            ai_perspective=item.ai_perspective,
+        )
+        for item in items
+    ]
+
+    assert summaries_to_markdown(summaries) == items_to_markdown(items)
@@ -9,6 +9,12 @@ class FakeContentFetcher:
     def __init__(self) -> None:
         self.urls: list[str] = []
 
+    async def __aenter__(self) -> "FakeContentFetcher":
+        return self
+
+    async def __aexit__(self, *_: object) -> None:
+        return None
+
     async def fetch(self, url: str) -> tuple[str | None, str | None]:
         self.urls.append(url)
         return "offline article", "<article>offline article</article>"
@@ -70,3 +76,96 @@ def test_hn_crawler_builds_items_offline_with_a_fake_content_fetcher() -> None:
         "generated_at_comment_count": None,
         "ai_perspective": None,
     }
+
+
+class SlowContentFetcher:
+    def __init__(self, delays: dict[str, float]) -> None:
+        self._delays = delays
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def __aenter__(self) -> "SlowContentFetcher":
+        return self
+
+    async def __aexit__(self, *_: object) -> None:
+        return None
+
+    async def fetch(self, url: str) -> tuple[str | None, str | None]:
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self._delays[url])
+        finally:
+            self.in_flight -= 1
+        return f"text for {url}", None
+
+
+def test_hn_crawler_fetches_concurrently_in_story_order_and_isolates_hung_urls() -> None:
+    now = datetime(2026, 7, 17, 10, 0, tzinfo=UTC)
+    delays = {
+        "https://example.test/slow": 0.05,
+        "https://example.test/hung": 60,
+        "https://example.test/fast": 0,
+        "https://example.test/medium": 0.02,
+    }
+    stories = [
+        SimpleNamespace(id=index, title=f"Story {index}", url=url, time=now, comments=[])
+        for index, url in enumerate([*delays, None])
+    ]
+    content_fetcher = SlowContentFetcher(delays)
+    crawler = HackerNewsCrawler(
+        content_fetcher=content_fetcher,
+        client_factory=lambda **_: FakeHackerNewsClient(stories),
+        clock=lambda: now,
+        fetch_concurrency=2,
+        fetch_timeout=0.2,
+    )
+
+    items = asyncio.run(crawler.fetch_top_stories("cache.sqlite", count=1))
+
+    assert content_fetcher.max_in_flight == 2
+    assert [item.id for item in items] == ["0", "1", "2", "3", "4"]
+    assert [item.content for item in items] == [
+        "text for https://example.test/slow",
+        None,
+        "text for https://example.test/fast",
+        "text for https://example.test/medium",
+        None,
+    ]
+
+
+def test_hn_crawler_fetches_only_comments_for_known_items_and_urls() -> None:
+    now = datetime(2026, 7, 17, 10, 0, tzinfo=UTC)
+    stories = [
+        SimpleNamespace(
+            id=story_id,
+            title=f"Story {story_id}",
+            url=f"https://example.test/{story_id}",
+            time=now,
+            comments=[SimpleNamespace(by="alice", text=f"fresh comment on {story_id}")],
+        )
+        for story_id in (1, 2, 3)
+    ]
+    stories[2].url = "http://www.example.test/already-stored/?utm_source=hn"
+    content_fetcher = FakeContentFetcher()
+    crawler = HackerNewsCrawler(
+        content_fetcher=content_fetcher,
+        client_factory=lambda **_: FakeHackerNewsClient(stories),
+        clock=lambda: now,
+    )
+
+    items = asyncio.run(
+        crawler.fetch_top_stories(
+            "cache.sqlite",
+            count=1,
+            known_ids={"1"},
+            known_urls={"https://example.test/already-stored"},
+        )
+    )
+
+    assert content_fetcher.urls == ["https://example.test/2"]
+    assert [(item.content, item.comments[0].content) for item in items] == [
+        (None, "fresh comment on 1"),
+        ("offline article", "fresh comment on 2"),
+        (None, "fresh comment on 3"),
+    ]
@@ -0,0 +1,82 @@
+import asyncio
+from datetime import UTC, datetime, timedelta
+
+from host_health import HostCircuitBreaker, Route
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = datetime(2026, 7, 17, tzinfo=UTC)
+
+    def __call__(self) -> datetime:
+        return self.now
+
+
+def test_circuit_opens_after_repeated_direct_failures_and_routes_to_the_last_working_fallback(tmp_path) -> None:
+    clock = Clock()
+    breaker = HostCircuitBreaker(
+        tmp_path / "hosts.sqlite", failure_threshold=2, cooldown=timedelta(days=1), clock=clock
+    )
+    url = "https://www.paywalled.test/story"
+
+    breaker.record(url, direct_succeeded=False, strategy="Jina.ai", seconds=12)
+    assert breaker.route(url) is Route.DIRECT
+
+    breaker.record(url, direct_succeeded=False, strategy="Jina.ai", seconds=8)
+    assert breaker.route("https://paywalled.test/another") is Route.FALLBACK
+
+    clock.now += timedelta(days=1)
+    assert breaker.route(url) is Route.DIRECT
+
+    breaker.record(url, direct_succeeded=True, strategy="trafilatura", seconds=1)
+    record = breaker.records["paywalled.test"]
+    assert (record.consecutive_failures, record.open_until) == (0, None)
+    assert (record.fetch_count, record.failure_count, record.total_seconds) == (3, 0, 21)
+
+
+def test_circuit_skips_hosts_with_no_working_strategy_for_the_cooldown(tmp_path) -> None:
+    clock = Clock()
+    breaker = HostCircuitBreaker(
+        tmp_path / "hosts.sqlite", failure_threshold=1, cooldown=timedelta(hours=6), clock=clock
+    )
+    url = "https://blocked.test/story"
+
+    breaker.record(url, direct_succeeded=False, strategy=None, seconds=20)
+
+    assert breaker.route(url) is Route.SKIP
+    assert breaker.route("https://other.test/story") is Route.DIRECT
+    assert breaker.records["blocked.test"].skip_count == 1
+    assert breaker.records["blocked.test"].failure_count == 1
+
+
+def test_host_records_survive_between_runs_and_stale_hosts_expire(tmp_path) -> None:
+    async def scenario() -> None:
+        clock = Clock()
+        path = tmp_path / "hosts.sqlite"
+        breaker = HostCircuitBreaker(path, failure_threshold=1, clock=clock)
+        await breaker.load()
+        breaker.record("https://slow.test/a", direct_succeeded=False, strategy="Jina.ai", seconds=30)
+        await breaker.save()
+
+        next_run = HostCircuitBreaker(path, failure_threshold=1, clock=clock)
+        await next_run.load()
+        assert next_run.records == breaker.records
+        assert next_run.route("https://slow.test/b") is Route.FALLBACK
+
+        clock.now += timedelta(days=181)
+        await next_run.save()
+        later_run = HostCircuitBreaker(path, clock=clock)
+        await later_run.load()
+        assert later_run.records == {}
+
+    asyncio.run(scenario())
+
+
+def test_first_run_creates_the_missing_cache_directory(tmp_path) -> None:
+    path = tmp_path / "cache" / "social.sqlite"
+    breaker = HostCircuitBreaker(path)
+
+    asyncio.run(breaker.load())
+
+    assert breaker.records == {}
+    assert path.exists()
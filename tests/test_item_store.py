@@ -1,7 +1,11 @@
 import asyncio
+import os
+import sqlite3
 from datetime import UTC, datetime, timedelta
 
-from item_store import ItemStore
+import item_store
+import pytest
+from item_store import ItemStore, RetentionPolicy
 from models import Comment, Item, Perspective, Viewpoint
 
 
@@ -36,72 +40,467 @@ def item(
 
 def test_reconcile_returns_a_new_item_unchanged(tmp_path) -> None:
     async def scenario() -> None:
-        store = ItemStore(tmp_path / "items.sqlite")
-        await store.init()
-        now = datetime(2026, 7, 17, tzinfo=UTC)
-        fetched = item("new", updated_at=now)
+        async with ItemStore(tmp_path / "items.sqlite") as store:
+            now = datetime(2026, 7, 17, tzinfo=UTC)
+            fetched = item("new", updated_at=now)
 
-        reconciled = await store.reconcile(now, [fetched])
+            reconciled = await store.reconcile(now, [fetched])
 
-        assert reconciled == [fetched]
-        assert reconciled[0] is fetched
+            assert reconciled == [fetched]
+            assert reconciled[0] is fetched
 
     asyncio.run(scenario())
 
 
 def test_reconcile_keeps_cached_perspective_and_takes_fresh_comments(tmp_path) -> None:
     async def scenario() -> None:
-        store = ItemStore(tmp_path / "items.sqlite")
-        await store.init()
-        cached_at = datetime(2026, 7, 16, tzinfo=UTC)
-        cached = item(
-            "cached",
-            updated_at=cached_at,
-            comments=[Comment(author="old", content="old comment")],
-            perspective_title="Keep me",
-        )
-        await store.save(cached)
-        now = datetime(2026, 7, 17, tzinfo=UTC)
-        fresh_comments = [Comment(author="new", content="fresh comment")]
-        fetched = item("cached", updated_at=now, comments=fresh_comments)
-        fetched.title = "Fresh title is not part of the current merge policy"
+        async with ItemStore(tmp_path / "items.sqlite") as store:
+            cached_at = datetime(2026, 7, 16, tzinfo=UTC)
+            cached = item(
+                "cached",
+                updated_at=cached_at,
+                comments=[Comment(author="old", content="old comment")],
+                perspective_title="Keep me",
+            )
+            await store.save(cached)
+            now = datetime(2026, 7, 17, tzinfo=UTC)
+            fresh_comments = [Comment(author="new", content="fresh comment")]
+            fetched = item("cached", updated_at=now, comments=fresh_comments)
+            fetched.title = "Fresh title is not part of the current merge policy"
+
+            reconciled = await store.reconcile(now, [fetched])
+
+            assert reconciled[0].title == "Item cached"
+            assert reconciled[0].comments == fresh_comments
+            assert reconciled[0].updated_at == now
+            assert reconciled[0].ai_perspective == cached.ai_perspective
+            assert reconciled[0].generated_at_comment_count == 15
+
+    asyncio.run(scenario())
+
+
+def test_reconcile_keeps_the_comment_fingerprints_of_the_cached_perspective(tmp_path) -> None:
+    async def scenario() -> None:
+        async with ItemStore(tmp_path / "items.sqlite") as store:
+            now = datetime(2026, 7, 17, tzinfo=UTC)
+            cached = item("cached", updated_at=now, perspective_title="Fingerprinted")
+            cached.generated_from_comments = ["0123456789abcdef", "fedcba9876543210"]
+            plain = item("plain", updated_at=now, perspective_title="Older Perspective")
+            await store.save_many([cached, plain])
+
+            reconciled = await store.reconcile(now, [item("cached", updated_at=now), item("plain", updated_at=now)])
+
+            assert [each.generated_from_comments for each in reconciled] == [cached.generated_from_comments, None]
+            assert "generated_from_comments" not in reconciled[0].model_dump(mode="json")
+
+    asyncio.run(scenario())
 
-        reconciled = await store.reconcile(now, [fetched])
 
-        assert reconciled[0].title == "Item cached"
-        assert reconciled[0].comments == fresh_comments
-        assert reconciled[0].updated_at == now
-        assert reconciled[0].ai_perspective == cached.ai_perspective
-        assert reconciled[0].generated_at_comment_count == 15
+def test_known_ids_lists_cached_items(tmp_path) -> None:
+    async def scenario() -> None:
+        async with ItemStore(tmp_path / "items.sqlite") as store:
+            assert await store.known_ids() == set()
+
+            now = datetime(2026, 7, 17, tzinfo=UTC)
+            await store.save(item("first", updated_at=now))
+            await store.save(item("second", updated_at=now))
+
+            assert await store.known_ids() == {"first", "second"}
 
     asyncio.run(scenario())
 
 
 def test_cleanup_drops_old_items(tmp_path) -> None:
     async def scenario() -> None:
-        store = ItemStore(tmp_path / "items.sqlite")
-        await store.init()
-        now = datetime.now(UTC)
-        old = item(
-            "old",
-            updated_at=now - timedelta(days=181),
-            perspective_title="Old cached Perspective",
+        async with ItemStore(tmp_path / "items.sqlite") as store:
+            now = datetime.now(UTC)
+            old = item(
+                "old",
+                updated_at=now - timedelta(days=181),
+                perspective_title="Old cached Perspective",
+            )
+            recent = item(
+                "recent",
+                updated_at=now - timedelta(days=1),
+                perspective_title="Recent cached Perspective",
+            )
+            old.content = "Old article"
+            recent.content = "Recent article"
+            await store.save(old)
+            await store.save(recent)
+
+            assert await store.cleanup() == 1
+            cursor = await store._database.execute("SELECT item_id FROM item_perspective")
+            assert [row[0] for row in await cursor.fetchall()] == ["recent"]
+            cursor = await store._database.execute("SELECT content FROM article_body")
+            assert [row[0] for row in await cursor.fetchall()] == ["Recent article"]
+
+            fetched_old = item("old", updated_at=now)
+            fetched_recent = item("recent", updated_at=now)
+            reconciled = await store.reconcile(now, [fetched_old, fetched_recent])
+            assert reconciled[0] is fetched_old
+            assert reconciled[0].ai_perspective is None
+            assert reconciled[1].ai_perspective == recent.ai_perspective
+
+    asyncio.run(scenario())
+
+
+def test_store_keeps_one_wal_connection_and_persists_across_runs(tmp_path) -> None:
+    async def scenario() -> None:
+        path = tmp_path / "items.sqlite"
+        now = datetime(2026, 7, 17, tzinfo=UTC)
+        async with ItemStore(path) as store:
+            cursor = await store._database.execute("PRAGMA journal_mode")
+            assert (await cursor.fetchone())[0] == "wal"
+            cursor = await store._database.execute("PRAGMA synchronous")
+            assert (await cursor.fetchone())[0] == 1
+            await store.save(item("kept", updated_at=now))
+
+        with pytest.raises(RuntimeError):
+            await store.known_ids()
+
+        async with ItemStore(path) as reopened:
+            assert await reopened.known_ids() == {"kept"}
+
+    asyncio.run(scenario())
+
+
+def test_reconcile_looks_up_cached_items_in_chunks_and_keeps_fetch_order(tmp_path, monkeypatch) -> None:
+    monkeypatch.setattr(item_store, "LOOKUP_CHUNK_SIZE", 2)
+
+    async def scenario() -> None:
+        async with ItemStore(tmp_path / "items.sqlite") as store:
+            cached_at = datetime(2026, 7, 16, tzinfo=UTC)
+            for item_id in ("a", "c", "e"):
+                await store.save(item(item_id, updated_at=cached_at, perspective_title=f"Cached {item_id}"))
+            now = datetime(2026, 7, 17, tzinfo=UTC)
+            fetched = [item(item_id, updated_at=now) for item_id in ("e", "b", "a", "d", "c")]
+
+            reconciled = await store.reconcile(now, fetched)
+
+            assert [reconciled_item.id for reconciled_item in reconciled] == ["e", "b", "a", "d", "c"]
+            assert [
+                reconciled_item.ai_perspective and reconciled_item.ai_perspective.title
+                for reconciled_item in reconciled
+            ] == [
+                "Cached e",
+                None,
+                "Cached a",
+                None,
+                "Cached c",
+            ]
+            assert reconciled[1] is fetched[1]
+            assert all(reconciled_item.updated_at == now for reconciled_item in reconciled)
+
+    asyncio.run(scenario())
+
+
+def test_save_many_writes_every_chunk_in_one_transaction(tmp_path) -> None:
+    async def scenario() -> None:
+        async with ItemStore(tmp_path / "items.sqlite") as store:
+            now = datetime(2026, 7, 17, tzinfo=UTC)
+            items = [item(str(index), updated_at=now) for index in range(5)]
+
+            assert await store.save_many(items, chunk_size=2) == 5
+            assert await store.known_ids() == {"0", "1", "2", "3", "4"}
+
+            # created_at=None fails serialisation in the last chunk, after earlier chunks were already written.
+            broken = Item.model_construct(
+                id="broken", title="Broken", url="https://example.test/broken", updated_at=now
+            )
+            with pytest.raises(AttributeError):
+                await store.save_many([item("5", updated_at=now), item("6", updated_at=now), broken], chunk_size=2)
+
+            assert await store.known_ids() == {"0", "1", "2", "3", "4"}
+            with pytest.raises(ValueError):
+                await store.save_many(items, chunk_size=0)
+
+    asyncio.run(scenario())
+
+
+def test_save_rewrites_only_the_parts_that_changed(tmp_path) -> None:
+    async def scenario() -> None:
+        async with ItemStore(tmp_path / "items.sqlite") as store:
+            cached_at = datetime(2026, 7, 16, tzinfo=UTC)
+            cached = item("cached", updated_at=cached_at, perspective_title="Keep me")
+            cached.content = "Article text " * 1000
+            cached.content_html = "<p>Article text</p>" * 1000
+            await store.save(cached)
+
+            now = datetime(2026, 7, 17, tzinfo=UTC)
+            fresh = item("cached", updated_at=now, comments=[Comment(author="new", content="fresh comment")])
+            [reconciled] = await store.reconcile(now, [fresh])
+            await store.save(reconciled)
+            reconciled.comments.append(Comment(author="later", content="another comment"))
+            await store.save(reconciled)
+
+            # Changed comments are re-indexed; saving the same Item again rewrites only its item row.
+            cursor = await store._database.execute(
+                "SELECT COUNT(*) FROM item_search WHERE item_search MATCH 'another' AND rowid IN "
+                "(SELECT search_id FROM item_search_row WHERE item_id = 'cached')"
+            )
+            assert (await cursor.fetchone())[0] == 1
+            changes_after = store._database.total_changes
+            await store.save(reconciled)
+            assert store._database.total_changes - changes_after == 1
+            cursor = await store._database.execute("SELECT typeof(content), typeof(content_html) FROM article_body")
+            assert tuple(await cursor.fetchone()) == ("blob", "blob")
+            [reloaded] = await store.reconcile(now, [fresh])
+            assert reloaded.content == cached.content
+            assert reloaded.content_html == cached.content_html
+            assert reloaded.ai_perspective == cached.ai_perspective
+
+    asyncio.run(scenario())
+
+
+def test_opening_a_payload_database_migrates_it_to_the_normalised_schema(tmp_path) -> None:
+    path = tmp_path / "items.sqlite"
+    cached_at = datetime(2026, 7, 16, tzinfo=UTC)
+    cached = item(
+        "cached",
+        updated_at=cached_at,
+        comments=[Comment(author="old", content="old comment")],
+        perspective_title="Keep me",
+    )
+    cached.content = "Cached article"
+    with sqlite3.connect(path) as database:
+        database.execute(
+            "CREATE TABLE item (id TEXT PRIMARY KEY, created_at TEXT NOT NULL, updated_at TEXT NOT NULL, "
+            "payload TEXT NOT NULL)"
         )
-        recent = item(
-            "recent",
-            updated_at=now - timedelta(days=1),
-            perspective_title="Recent cached Perspective",
+        database.execute("CREATE INDEX idx_item_updated_at ON item(updated_at)")
+        database.execute(
+            "INSERT INTO item VALUES (?, ?, ?, ?)",
+            (cached.id, cached.created_at.isoformat(), cached.updated_at.isoformat(), cached.model_dump_json()),
         )
-        await store.save(old)
-        await store.save(recent)
+    database.close()
 
-        assert await store.cleanup(before_days=180) == 1
+    async def scenario() -> None:
+        async with ItemStore(path) as store:
+            now = datetime(2026, 7, 17, tzinfo=UTC)
+            [reconciled] = await store.reconcile(now, [item("cached", updated_at=now)])
 
-        fetched_old = item("old", updated_at=now)
-        fetched_recent = item("recent", updated_at=now)
-        reconciled = await store.reconcile(now, [fetched_old, fetched_recent])
-        assert reconciled[0] is fetched_old
-        assert reconciled[0].ai_perspective is None
-        assert reconciled[1].ai_perspective == recent.ai_perspective
+            assert reconciled.content == "Cached article"
+            assert reconciled.ai_perspective == cached.ai_perspective
+            assert reconciled.generated_at_comment_count == 15
+            assert reconciled.created_at == cached.created_at
+            cursor = await store._database.execute("PRAGMA user_version")
+            assert (await cursor.fetchone())[0] == item_store.SCHEMA_VERSION
+            cursor = await store._database.execute("SELECT name FROM sqlite_master WHERE tbl_name = 'item'")
+            assert {row[0] for row in await cursor.fetchall()} >= {"item", "idx_item_updated_at"}
+            cursor = await store._database.execute("SELECT comments FROM item_comments")
+            assert "old comment" in (await cursor.fetchone())[0]
+            cursor = await store._database.execute("PRAGMA auto_vacuum")
+            assert (await cursor.fetchone())[0] == item_store.INCREMENTAL_AUTO_VACUUM
+            assert [hit.id for hit in await store.search("cached article")] == ["cached"]
+
+        async with ItemStore(path) as reopened:
+            assert await reopened.known_ids() == {"cached"}
+
+    asyncio.run(scenario())
+
+
+def test_items_share_one_stored_body_and_new_items_reuse_it_by_url(tmp_path) -> None:
+    async def scenario() -> None:
+        async with ItemStore(tmp_path / "items.sqlite") as store:
+            now = datetime.now(UTC)
+            first = item("first", updated_at=now)
+            first.original_url = "https://www.example.test/story?utm_source=hn"
+            first.content, first.content_html = "Shared article", "<p>Shared article</p>"
+            mirror = item("mirror", updated_at=now)
+            mirror.content, mirror.content_html = first.content, first.content_html
+            stale = item("stale", updated_at=now - timedelta(days=30))
+            stale.original_url = "https://example.test/stale"
+            stale.content = "Stale article"
+            await store.save_many([first, mirror, stale])
+
+            cursor = await store._database.execute("SELECT COUNT(*) FROM article_body")
+            assert (await cursor.fetchone())[0] == 2
+            assert await store.known_urls() == {"https://example.test/story"}
+
+            resubmitted = item("resubmitted", updated_at=now)
+            resubmitted.original_url = "http://example.test/story/"
+            unrelated = item("unrelated", updated_at=now)
+            [attached, untouched] = await store.reconcile(now, [resubmitted, unrelated])
+
+            assert (attached.content, attached.content_html) == ("Shared article", "<p>Shared article</p>")
+            assert attached.id == "resubmitted"
+            assert untouched is unrelated
+
+    asyncio.run(scenario())
+
+
+def test_iter_summaries_projects_recent_items_without_bodies_or_comments(tmp_path) -> None:
+    async def scenario() -> None:
+        async with ItemStore(tmp_path / "items.sqlite") as store:
+            now = datetime.now(UTC)
+            summarised = item(
+                "summarised",
+                updated_at=now,
+                comments=[Comment(author="alice", content="one"), Comment(author="bob", content="two")],
+                perspective_title="Cached",
+            )
+            summarised.content = "Article body " * 200
+            plain = item("plain", updated_at=now - timedelta(hours=1))
+            old = item("old", updated_at=now - timedelta(days=30))
+            await store.save_many([plain, summarised, old])
+
+            summaries = [summary async for summary in store.iter_summaries(since=now - timedelta(days=1))]
+
+            assert [summary.id for summary in summaries] == ["summarised", "plain"]
+            assert summaries[0].comment_count == 2
+            assert summaries[0].ai_perspective == summarised.ai_perspective
+            assert (summaries[1].comment_count, summaries[1].ai_perspective) == (0, None)
+            assert len([summary async for summary in store.iter_summaries()]) == 3
+
+    asyncio.run(scenario())
+
+
+def test_cleanup_expires_in_chunks_and_hands_free_pages_back(tmp_path) -> None:
+    async def scenario() -> None:
+        path = tmp_path / "items.sqlite"
+        async with ItemStore(path, retention=RetentionPolicy(chunk_size=2)) as store:
+            cursor = await store._database.execute("PRAGMA auto_vacuum")
+            assert (await cursor.fetchone())[0] == item_store.INCREMENTAL_AUTO_VACUUM
+
+            now = datetime.now(UTC)
+            items = [item(f"old-{index}", updated_at=now - timedelta(days=200 + index)) for index in range(5)]
+            items.append(item("recent", updated_at=now))
+            for each in items:
+                each.content = os.urandom(20_000).hex()
+            await store.save_many(items)
+            await store._database.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            size_before = path.stat().st_size
+
+            assert await store.cleanup() == 5
+            assert await store.known_ids() == {"recent"}
+            cursor = await store._database.execute("SELECT COUNT(*) FROM article_body")
+            assert (await cursor.fetchone())[0] == 1
+            cursor = await store._database.execute("PRAGMA freelist_count")
+            assert (await cursor.fetchone())[0] == 0
+            await store._database.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        assert path.stat().st_size < size_before
 
     asyncio.run(scenario())
+
+
+def test_cleanup_evicts_least_recently_updated_items_past_the_size_bound(tmp_path) -> None:
+    async def scenario() -> None:
+        path = tmp_path / "items.sqlite"
+        async with ItemStore(path, retention=RetentionPolicy(max_bytes=400_000)) as store:
+            now = datetime.now(UTC)
+            items = [item(str(index), updated_at=now - timedelta(hours=index)) for index in range(20)]
+            for each in items:
+                each.content = os.urandom(20_000).hex()
+            await store.save_many(items)
+
+            evicted = await store.cleanup()
+
+            remaining = await store.known_ids()
+            assert 0 < evicted < 20
+            assert remaining == {str(index) for index in range(20 - evicted)}
+            assert await store._live_bytes() <= 400_000
+
+    asyncio.run(scenario())
+
+
+def test_cleanup_leaves_tables_it_does_not_own_out_of_the_size_bound(tmp_path) -> None:
+    path = tmp_path / "items.sqlite"
+    with sqlite3.connect(path) as database:
+        database.execute("CREATE TABLE host_health (host TEXT PRIMARY KEY, state BLOB)")
+        database.executemany(
+            "INSERT INTO host_health VALUES (?, ?)", [(f"host-{index}", os.urandom(10_000)) for index in range(100)]
+        )
+    database.close()
+
+    async def scenario() -> None:
+        async with ItemStore(path, retention=RetentionPolicy(max_bytes=400_000)) as store:
+            now = datetime.now(UTC)
+            items = [item(str(index), updated_at=now - timedelta(hours=index)) for index in range(5)]
+            await store.save_many(items)
+
+            assert await store.cleanup() == 0
+            assert await store.known_ids() == {str(index) for index in range(5)}
+            assert 0 < await store._stored_bytes() <= await store._live_bytes() < 400_000
+
+    asyncio.run(scenario())
+
+
+def test_search_ranks_matches_across_fields_and_drops_deleted_items(tmp_path) -> None:
+    async def scenario() -> None:
+        async with ItemStore(tmp_path / "items.sqlite") as store:
+            now = datetime.now(UTC)
+            titled = item("titled", updated_at=now)
+            titled.title = "Rewriting the compiler in Rust"
+            discussed = item(
+                "discussed",
+                updated_at=now - timedelta(hours=1),
+                comments=[Comment(author="alice", content="Rust's borrow checker compiled this for me")],
+            )
+            summarised = item("summarised", updated_at=now - timedelta(hours=2), perspective_title="Compilers")
+            summarised.content = "An article about compilation pipelines."
+            expired = item("expired", updated_at=now - timedelta(days=365))
+            expired.title = "Rust in 2025"
+            await store.save_many([summarised, discussed, titled, expired])
+
+            assert [hit.id for hit in await store.search("rust")] == ["expired", "titled", "discussed"]
+            assert [hit.id for hit in await store.search("rust", since=now - timedelta(days=1))] == [
+                "titled",
+                "discussed",
+            ]
+            assert [hit.id for hit in await store.search("compile", limit=2)] == ["titled", "summarised"]
+            assert [hit.id for hit in await store.search("cached view")] == ["summarised"]
+            [hit] = await store.search("borrow checker")
+            assert (hit.id, hit.comment_count) == ("discussed", 1)
+            assert await store.search('c++ "AND') == []
+            assert await store.search("  ") == []
+
+            await store.cleanup()
+            assert [hit.id for hit in await store.search("rust")] == ["titled", "discussed"]
+            cursor = await store._database.execute("SELECT COUNT(*) FROM item_search WHERE item_search MATCH '2025'")
+            assert (await cursor.fetchone())[0] == 0
+
+    asyncio.run(scenario())
+
+
+def test_search_indexes_full_text_and_forgets_replaced_text(tmp_path) -> None:
+    async def scenario() -> None:
+        async with ItemStore(tmp_path / "items.sqlite") as store:
+            now = datetime.now(UTC)
+            long_read = item(
+                "long",
+                updated_at=now,
+                comments=[Comment(author="a", content="ballast " * 2_000 + "zeppelins")],
+                perspective_title="Airships",
+            )
+            long_read.content = "Hydrogen " * 2_000 + "dirigibles"
+            await store.save(long_read)
+
+            assert [hit.id for hit in await store.search("dirigibles")] == ["long"]
+            assert [hit.id for hit in await store.search("zeppelins")] == ["long"]
+
+            long_read.content = "A shorter article about blimps"
+            long_read.comments = [Comment(author="b", content="gondolas")]
+            long_read.ai_perspective = None
+            await store.save(long_read)
+
+            assert [hit.id for hit in await store.search("blimps gondolas")] == ["long"]
+            # The contentless index only drops a row given the exact text it indexed, so nothing of the old one is left.
+            for replaced in ("dirigibles", "zeppelins", "hydrogen", "airships"):
+                cursor = await store._database.execute(
+                    "SELECT COUNT(*) FROM item_search WHERE item_search MATCH ?", (replaced,)
+                )
+                assert (await cursor.fetchone())[0] == 0
+            cursor = await store._database.execute("SELECT typeof(content) FROM item_search")
+            assert (await cursor.fetchone())[0] == "null"
+
+    asyncio.run(scenario())
+
+
+def test_retention_policy_rejects_invalid_bounds() -> None:
+    with pytest.raises(ValueError):
+        RetentionPolicy(chunk_size=0)
+    with pytest.raises(ValueError):
+        RetentionPolicy(max_bytes=0)
+    with pytest.raises(ValueError):
+        RetentionPolicy(merge_pages=0)
@@ -0,0 +1,58 @@
+import json
+from datetime import UTC, datetime
+
+from exporter import FeedIdentity, items_to_json_feed, items_to_raw_json, items_to_raw_json_bytes
+from json_codec import (
+    EXPORT_INDENT,
+    decode_comments,
+    decode_items,
+    decode_perspective,
+    encode_comments,
+    encode_json,
+    encode_perspective,
+)
+from models import Comment, Item, Perspective, Viewpoint
+
+
+def fixture_item() -> Item:
+    now = datetime(2026, 7, 17, 8, 0, tzinfo=UTC)
+    return Item(
+        id="1",
+        title="Ünïcode “quotes” </script>",
+        url="https://example.test/discussions/1",
+        content="Article text",
+        comments=[Comment(author="alice", content="Useful — really")],
+        created_at=now,
+        updated_at=now,
+        generated_at_comment_count=1,
+        ai_perspective=Perspective(
+            title="A shared theme",
+            summary="Readers broadly agree.",
+            sentiment="positive",
+            viewpoints=[Viewpoint(statement="The change is useful", support_percentage=60)],
+        ),
+    )
+
+
+def test_exports_match_json_dump_byte_for_byte() -> None:
+    items = [fixture_item()]
+    identity = FeedIdentity(
+        source_name="Hacker News",
+        feed_title="Social Trending",
+        home_page_url="https://news.example/",
+        feed_url="https://feeds.example/hn.json",
+        tags=("hn",),
+    )
+    feed = items_to_json_feed(items, identity=identity)
+
+    assert items_to_raw_json_bytes(items) == json.dumps(items_to_raw_json(items), indent=2, ensure_ascii=False).encode()
+    assert encode_json(feed, indent=EXPORT_INDENT) == json.dumps(feed, indent=2, ensure_ascii=False).encode()
+
+
+def test_stored_parts_round_trip() -> None:
+    item = fixture_item()
+
+    assert decode_items(items_to_raw_json_bytes([item])) == [item]
+    assert decode_comments(encode_comments(item.comments)) == item.comments
+    assert decode_perspective(encode_perspective(item.ai_perspective)) == item.ai_perspective
+    assert decode_perspective(None) is None
@@ -0,0 +1,63 @@
+import asyncio
+from datetime import UTC, datetime, timedelta
+
+import pytest
+from models import Perspective, Viewpoint
+from perspective_cache import PerspectiveCache, prompt_fingerprint
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = datetime(2026, 7, 17, tzinfo=UTC)
+
+    def __call__(self) -> datetime:
+        return self.now
+
+
+PERSPECTIVE = Perspective(
+    title="Cached",
+    summary="Stored after the first call.",
+    sentiment="mixed",
+    viewpoints=[Viewpoint(statement="Worth keeping", support_percentage=70)],
+)
+
+
+def test_fingerprint_covers_model_system_prompt_and_prompt() -> None:
+    fingerprint = prompt_fingerprint("provider/model", "system", "prompt")
+
+    assert fingerprint == prompt_fingerprint("provider/model", "system", "prompt")
+    assert fingerprint != prompt_fingerprint("provider/other", "system", "prompt")
+    assert fingerprint != prompt_fingerprint("provider/model", "system!", "prompt")
+    assert fingerprint != prompt_fingerprint("provider/model", "system", "prompt!")
+    assert prompt_fingerprint("a", "bc", "d") != prompt_fingerprint("ab", "c", "d")
+
+
+def test_cached_responses_survive_between_runs_until_they_expire(tmp_path) -> None:
+    async def scenario() -> None:
+        clock = Clock()
+        path = tmp_path / "cache.sqlite"
+        fingerprint = prompt_fingerprint("provider/model", "system", "prompt")
+        async with PerspectiveCache(path, ttl=timedelta(days=2), clock=clock) as cache:
+            await cache.put(
+                fingerprint, model="provider/model", response="<title>Cached</title>", perspective=PERSPECTIVE
+            )
+
+        async with PerspectiveCache(path, ttl=timedelta(days=2), clock=clock) as cache:
+            assert await cache.get(fingerprint) == PERSPECTIVE
+            assert await cache.get(prompt_fingerprint("provider/model", "system", "other")) is None
+
+            clock.now += timedelta(days=3)
+            assert await cache.get(fingerprint) is None
+            assert await cache.expire() == 1
+
+    asyncio.run(scenario())
+
+
+def test_cache_rejects_a_non_positive_ttl(tmp_path) -> None:
+    with pytest.raises(ValueError, match="ttl must be positive"):
+        PerspectiveCache(tmp_path / "cache.sqlite", ttl=timedelta(0))
+
+
+def test_cache_requires_the_connection_lifecycle(tmp_path) -> None:
+    with pytest.raises(RuntimeError, match="async context manager"):
+        asyncio.run(PerspectiveCache(tmp_path / "cache.sqlite").get("fingerprint"))
@@ -1,14 +1,22 @@
 import asyncio
+import sqlite3
 from datetime import UTC, datetime
 
 import pytest
-from models import Comment, Item
+from models import Comment, Item, Perspective, Viewpoint
+from perspective_cache import PerspectiveCache
 from perspective_generator import (
+    BATCH_SYSTEM_PROMPT,
+    REFRESH_SYSTEM_PROMPT,
+    SYSTEM_PROMPT,
     PerspectiveGenerationError,
     SmolLLMPerspectiveGenerator,
     needs_refresh,
     parse_perspective,
+    parse_perspectives,
+    perspective_to_xml,
 )
+from prompt_builder import PromptBuilder
 from smolllm import LLMResponse
 
 
@@ -117,6 +125,181 @@ def test_generator_reads_typed_smolllm_response() -> None:
     assert calls[0][1]["stream"] is False
 
 
+def test_generator_answers_repeated_prompts_from_the_cache(tmp_path) -> None:
+    calls: list[str] = []
+
+    async def fake_ask(prompt: str, **kwargs: object) -> LLMResponse:
+        calls.append(prompt)
+        text = (
+            "unparseable"
+            if "Broken" in prompt
+            else (
+                "<title>Cached once</title><summary>Asked once.</summary><sentiment>mixed</sentiment>"
+                '<viewpoint support="100">One call per prompt.</viewpoint>'
+            )
+        )
+        return LLMResponse(text=text, model="smolserver/fast", model_name="fast")
+
+    comments = [Comment(author="reader", content="A useful comment")]
+
+    async def scenario() -> None:
+        for _ in range(2):
+            # A fresh generator per run, as after a crash: only the SQLite file carries over.
+            async with PerspectiveCache(tmp_path / "cache.sqlite") as cache:
+                generator = SmolLLMPerspectiveGenerator(model="smolserver/fast", ask=fake_ask, cache=cache)
+                assert (await generator.generate(title="A title", comments=comments)).title == "Cached once"
+                with pytest.raises(PerspectiveGenerationError):
+                    await generator.generate(title="Broken", comments=comments)
+
+    asyncio.run(scenario())
+
+    assert calls == [
+        "Title: A title\nComments:\n- reader: A useful comment",
+        "Title: Broken\nComments:\n- reader: A useful comment",
+        "Title: Broken\nComments:\n- reader: A useful comment",
+    ]
+
+
+def test_generator_refresh_sends_the_earlier_perspective_and_only_new_comments() -> None:
+    calls: list[tuple[str, dict[str, object]]] = []
+
+    async def fake_ask(prompt: str, **kwargs: object) -> LLMResponse:
+        calls.append((prompt, kwargs))
+        return LLMResponse(
+            text=(
+                "<title>Updated</title><summary>Now with late replies.</summary><sentiment>mixed</sentiment>"
+                '<viewpoint support="40">Still useful.</viewpoint><viewpoint support="60">Too slow.</viewpoint>'
+            ),
+            model="smolserver/fast",
+            model_name="fast",
+        )
+
+    earlier = Perspective(
+        title="Original",
+        summary="Readers liked it.",
+        sentiment="positive",
+        viewpoints=[Viewpoint(statement="Still useful.", support_percentage=100)],
+    )
+    generator = SmolLLMPerspectiveGenerator(model="smolserver/fast", ask=fake_ask)
+    refreshed = asyncio.run(
+        generator.refresh(
+            title="A title",
+            perspective=earlier,
+            new_comments=[Comment(author="late", content="Too slow for me")],
+            previous_comment_count=15,
+        )
+    )
+
+    assert [viewpoint.support_percentage for viewpoint in refreshed.viewpoints] == [40, 60]
+    assert calls[0][0] == (
+        "Title: A title\n"
+        "Earlier analysis of 15 comments:\n"
+        "<title>Original</title>\n"
+        "<summary>Readers liked it.</summary>\n"
+        "<sentiment>positive</sentiment>\n"
+        '<viewpoint support="100">Still useful.</viewpoint>\n'
+        "New comments:\n"
+        "- late: Too slow for me"
+    )
+    assert calls[0][1]["system_prompt"] == REFRESH_SYSTEM_PROMPT
+    assert parse_perspective(perspective_to_xml(earlier)) == earlier
+
+
+def xml_perspective(title: str) -> str:
+    return (
+        f"<title>{title}</title><summary>Summary of {title}.</summary><sentiment>mixed</sentiment>"
+        '<viewpoint support="100">One view.</viewpoint>'
+    )
+
+
+def test_parse_perspectives_splits_a_batched_response_per_item() -> None:
+    response = (
+        f'Preamble.\n<item id="1">{xml_perspective("First")}</item>\n'
+        '<item id="2">not structured output</item>\n'
+        f"<item id='3'>\n{xml_perspective('Third')}\n</item>"
+    )
+
+    perspectives = parse_perspectives(response)
+
+    assert {item_id: perspective.title for item_id, perspective in perspectives.items()} == {"1": "First", "3": "Third"}
+
+
+def test_generator_batches_items_and_caches_each_answer_under_its_batched_prompt(tmp_path) -> None:
+    calls: list[tuple[str, dict[str, object]]] = []
+
+    async def fake_ask(prompt: str, **kwargs: object) -> LLMResponse:
+        calls.append((prompt, kwargs))
+        if kwargs["system_prompt"] == BATCH_SYSTEM_PROMPT:
+            text = f'<item id="1">{xml_perspective("First")}</item><item id="2">truncated <title>Sec'
+        else:
+            text = xml_perspective("Alone")
+        return LLMResponse(text=text, model="smolserver/fast", model_name="fast")
+
+    comments = [Comment(author="reader", content="A useful comment")]
+
+    async def scenario() -> None:
+        async with PerspectiveCache(tmp_path / "cache.sqlite") as cache:
+            generator = SmolLLMPerspectiveGenerator(model="smolserver/fast", ask=fake_ask, cache=cache)
+            discussions = {"1": ("First title", comments), "2": ("Second title", comments)}
+            batched = await generator.generate_batch(discussions)
+            assert {item_id: perspective.title for item_id, perspective in batched.items()} == {"1": "First"}
+            # The batched answer came from another system prompt, so it does not stand in for a single request.
+            assert (await generator.generate(title="First title", comments=comments)).title == "Alone"
+            # It is reused when the same Item is batched again, whatever it is grouped with.
+            batched = await generator.generate_batch({"1": ("First title", comments)})
+            assert batched["1"].title == "First"
+
+    asyncio.run(scenario())
+
+    assert [kwargs["system_prompt"] for _, kwargs in calls] == [BATCH_SYSTEM_PROMPT, SYSTEM_PROMPT]
+    assert calls[0][0] == (
+        '<item id="1">\nTitle: First title\nComments:\n- reader: A useful comment\n</item>\n\n'
+        '<item id="2">\nTitle: Second title\nComments:\n- reader: A useful comment\n</item>'
+    )
+
+
+def test_generator_batches_untrimmed_items_within_the_prompt_budget() -> None:
+    prompts: list[str] = []
+
+    async def fake_ask(prompt: str, **kwargs: object) -> LLMResponse:
+        prompts.append(prompt)
+        sections = "".join(f'<item id="{item_id}">{xml_perspective(item_id)}</item>' for item_id in "abc")
+        return LLMResponse(text=sections, model="smolserver/fast", model_name="fast")
+
+    def discussion(length: int) -> tuple[str, list[Comment]]:
+        return "Title", [Comment(author="reader", content="x" * length)]
+
+    generator = SmolLLMPerspectiveGenerator(
+        model="smolserver/fast", ask=fake_ask, prompt_builder=PromptBuilder(max_tokens=120)
+    )
+
+    batched = asyncio.run(generator.generate_batch({"a": discussion(150), "b": discussion(300), "c": discussion(150)}))
+
+    # "b" would push the request past the budget, so it is left for a request of its own.
+    assert sorted(batched) == ["a", "c"]
+    assert prompts[0].count("x" * 150) == 2
+    assert '<item id="b">' not in prompts[0]
+
+
+class UnwritableCache:
+    async def get(self, fingerprint: str) -> None:
+        return None
+
+    async def put(self, fingerprint: str, **kwargs: object) -> None:
+        raise sqlite3.OperationalError("database is locked")
+
+
+def test_generator_keeps_the_perspective_when_the_cache_write_fails() -> None:
+    async def fake_ask(prompt: str, **kwargs: object) -> LLMResponse:
+        return LLMResponse(text=xml_perspective("Uncached"), model="smolserver/fast", model_name="fast")
+
+    generator = SmolLLMPerspectiveGenerator(model="smolserver/fast", ask=fake_ask, cache=UnwritableCache())
+
+    perspective = asyncio.run(generator.generate(title="A title", comments=[Comment(author="a", content="b")]))
+
+    assert perspective.title == "Uncached"
+
+
 def test_generator_maps_provider_failure_to_generation_error() -> None:
     async def failed_ask(prompt: str, **kwargs: object) -> LLMResponse:
         raise ValueError("provider returned invalid data")
@@ -152,3 +335,12 @@ def test_generator_configuration_fails_fast(monkeypatch: pytest.MonkeyPatch) ->
     monkeypatch.delenv("GEMINI_API_KEY", raising=False)
     with pytest.raises(ValueError, match="GEMINI_API_KEY is required"):
         SmolLLMPerspectiveGenerator.from_env()
+
+
+def test_generator_rejects_an_unknown_comment_ranking(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("SMOLLLM_MODEL", "smolserver/summary")
+    monkeypatch.setenv("SMOLSERVER_API_KEY", "test-key")
+    monkeypatch.setenv("LLM_COMMENT_RANKING", "loudest")
+
+    with pytest.raises(ValueError, match="loudest"):
+        SmolLLMPerspectiveGenerator.from_env()
@@ -0,0 +1,52 @@
+import pytest
+from models import Comment
+from prompt_builder import CommentRanking, PromptBuilder, estimate_tokens
+
+
+def test_prompts_within_budget_are_unchanged() -> None:
+    comments = [Comment(author="reader", content="A useful comment"), Comment(author="other", content="x" * 900)]
+
+    prompt = PromptBuilder().build("A title", comments)
+
+    assert prompt.text == f"Title: A title\nComments:\n- reader: A useful comment\n- other: {'x' * 500}"
+    assert (prompt.included_count, prompt.dropped_count) == (2, 0)
+    assert prompt.estimated_tokens == estimate_tokens(prompt.text)
+
+
+def test_diversity_ranking_takes_one_comment_per_author_and_skips_repeats() -> None:
+    comments = [
+        Comment(author="prolific", content="First take " + "a" * 60),
+        Comment(author="prolific", content="Second take " + "b" * 60),
+        Comment(author="echo", content="first TAKE  " + "A" * 60),
+        Comment(author="quiet", content="Only take " + "c" * 60),
+        Comment(author="prolific", content="Third take " + "d" * 60),
+    ]
+
+    prompt = PromptBuilder(max_tokens=60, ranking=CommentRanking.DIVERSITY).build("Hot thread", comments)
+
+    assert prompt.text == (
+        f"Title: Hot thread\nComments:\n- prolific: First take {'a' * 60}\n- quiet: Only take {'c' * 60}"
+    )
+    assert (prompt.included_count, prompt.dropped_count) == (2, 3)
+    assert prompt.estimated_tokens <= 60
+
+
+def test_length_and_original_rankings_fill_the_budget_in_their_own_order() -> None:
+    comments = [
+        Comment(author="short", content="Brief."),
+        Comment(author="medium", content="M" * 150),
+        Comment(author="long", content="L" * 300),
+    ]
+
+    by_length = PromptBuilder(max_tokens=90, ranking=CommentRanking.LENGTH).build("T", comments)
+    by_position = PromptBuilder(max_tokens=90, ranking=CommentRanking.ORIGINAL).build("T", comments)
+
+    # Once the longest comment is in, shorter ones still fill what is left of the budget.
+    assert by_length.text == f"Title: T\nComments:\n- short: Brief.\n- long: {'L' * 300}"
+    assert by_position.text == f"Title: T\nComments:\n- short: Brief.\n- medium: {'M' * 150}"
+    assert (by_length.dropped_count, by_position.dropped_count) == (1, 1)
+
+
+def test_builder_rejects_an_empty_budget() -> None:
+    with pytest.raises(ValueError, match="max_tokens"):
+        PromptBuilder(max_tokens=0)
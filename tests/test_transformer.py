@@ -2,9 +2,12 @@ import asyncio
 from datetime import UTC, datetime
 
 import pytest
+import transformer
 from models import Comment, Item, Perspective, Viewpoint
-from perspective_generator import PerspectiveGenerationError
-from transformer import Transformer
+from perspective_cache import PerspectiveCache
+from perspective_generator import PerspectiveGenerationError, SmolLLMPerspectiveGenerator, comment_fingerprint
+from smolllm import LLMResponse
+from transformer import TokenBucket, Transformer
 
 
 class FakePerspectiveGenerator:
@@ -127,3 +130,257 @@ def test_transformer_fails_fast_on_unexpected_generator_error() -> None:
 
     with pytest.raises(AssertionError, match="unexpected implementation defect"):
         asyncio.run(Transformer(perspective_generator=BrokenPerspectiveGenerator()).transform(items=[item]))
+
+
+class SlowPerspectiveGenerator(FakePerspectiveGenerator):
+    def __init__(self) -> None:
+        super().__init__()
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def generate(self, title: str, comments: list[Comment]) -> Perspective:
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        # Later Items finish first, so completion order differs from input order.
+        await asyncio.sleep(0.01 / int(title.rsplit(" ", 1)[-1]))
+        self.in_flight -= 1
+        if title == "Item 3":
+            raise PerspectiveGenerationError("provider unavailable")
+        return await super().generate(title=title, comments=comments)
+
+
+def test_transformer_generates_concurrently_up_to_the_limit_and_keeps_order() -> None:
+    now = datetime(2026, 7, 21, tzinfo=UTC)
+    comments = [Comment(author=f"reader-{index}", content=f"comment-{index}") for index in range(15)]
+    items = [
+        Item(
+            id=str(index),
+            title=f"Item {index}",
+            url=f"https://example.test/{index}",
+            comments=comments if index != 5 else comments[:2],
+            created_at=now,
+            updated_at=now,
+        )
+        for index in range(1, 9)
+    ]
+    generator = SlowPerspectiveGenerator()
+
+    transformed = asyncio.run(Transformer(generator, concurrency=3).transform(items=items))
+
+    assert generator.max_in_flight == 3
+    assert len(generator.calls) == 6
+    assert [item.id for item in transformed] == [str(index) for index in range(1, 9)]
+    assert [item.ai_perspective is not None for item in transformed] == [
+        True,
+        True,
+        False,
+        True,
+        False,
+        True,
+        True,
+        True,
+    ]
+
+
+def test_cached_perspectives_do_not_wait_for_the_rate_limit(tmp_path) -> None:
+    now = datetime(2026, 7, 21, tzinfo=UTC)
+    asked: list[str] = []
+
+    async def fake_ask(prompt: str, **kwargs: object) -> LLMResponse:
+        asked.append(prompt.partition("\n")[0])
+        text = (
+            "<title>Answered</title><summary>s</summary><sentiment>mixed</sentiment>"
+            '<viewpoint support="100">v</viewpoint>'
+        )
+        return LLMResponse(text=text, model="smolserver/fast", model_name="fast")
+
+    def items() -> list[Item]:
+        comments = [Comment(author=f"reader-{index}", content=f"comment-{index}") for index in range(15)]
+        return [
+            Item(
+                id=str(index),
+                title=f"Item {index}",
+                url="https://example.test",
+                comments=comments,
+                created_at=now,
+                updated_at=now,
+            )
+            for index in range(4)
+        ]
+
+    async def scenario() -> None:
+        async with PerspectiveCache(tmp_path / "cache.sqlite") as cache:
+            generator = SmolLLMPerspectiveGenerator(model="smolserver/fast", ask=fake_ask, cache=cache)
+            await Transformer(generator).transform(items=items()[:3])
+            # One request a day: only the single uncached Item may take the bucket's one token.
+            async with asyncio.timeout(5):
+                transformed = await Transformer(generator, requests_per_minute=1 / 1440).transform(items=items())
+        assert all(item.ai_perspective is not None for item in transformed)
+
+    asyncio.run(scenario())
+
+    assert asked == ["Title: Item 0", "Title: Item 1", "Title: Item 2", "Title: Item 3"]
+
+
+def test_token_bucket_spaces_requests_after_the_burst(monkeypatch) -> None:
+    now = 100.0
+    started: list[float] = []
+
+    async def fake_sleep(seconds: float) -> None:
+        nonlocal now
+        now += seconds
+
+    monkeypatch.setattr(transformer.asyncio, "sleep", fake_sleep)
+    bucket = TokenBucket(requests_per_minute=30, burst=2, clock=lambda: now)
+
+    async def scenario() -> None:
+        for _ in range(4):
+            await bucket.acquire()
+            started.append(now)
+
+    asyncio.run(scenario())
+
+    assert started == [100.0, 100.0, 102.0, 104.0]
+
+
+def test_transformer_rejects_invalid_limits() -> None:
+    with pytest.raises(ValueError, match="concurrency"):
+        Transformer(FakePerspectiveGenerator(), concurrency=0)
+    with pytest.raises(ValueError, match="requests_per_minute"):
+        Transformer(FakePerspectiveGenerator(), requests_per_minute=0)
+    with pytest.raises(ValueError, match="batch_size"):
+        Transformer(FakePerspectiveGenerator(), batch_size=0)
+
+
+class RefreshingPerspectiveGenerator(FakePerspectiveGenerator):
+    def __init__(self, *, refresh_fails: bool = False) -> None:
+        super().__init__()
+        self.refresh_calls: list[tuple[Perspective, list[Comment], int]] = []
+        self._refresh_fails = refresh_fails
+
+    async def refresh(
+        self, title: str, perspective: Perspective, new_comments: list[Comment], previous_comment_count: int
+    ) -> Perspective:
+        self.refresh_calls.append((perspective, new_comments, previous_comment_count))
+        if self._refresh_fails:
+            raise PerspectiveGenerationError("provider unavailable")
+        return perspective.model_copy(update={"summary": "Updated with new comments."})
+
+
+def refreshable_item(*, fingerprinted: bool = True) -> Item:
+    now = datetime(2026, 7, 21, tzinfo=UTC)
+    earlier = [Comment(author=f"reader-{index}", content=f"comment-{index}") for index in range(15)]
+    return Item(
+        id="1",
+        title="Growing thread",
+        url="https://example.test/1",
+        # One earlier comment was deleted, so counting alone would misjudge which comments are new.
+        comments=earlier[1:] + [Comment(author=f"late-{index}", content=f"late-{index}") for index in range(16)],
+        created_at=now,
+        updated_at=now,
+        ai_perspective=Perspective(
+            title="Cached result",
+            summary="From the first 15 comments.",
+            sentiment="mixed",
+            viewpoints=[Viewpoint(statement="A cached viewpoint", support_percentage=60)],
+        ),
+        generated_at_comment_count=15,
+        generated_from_comments=[comment_fingerprint(comment) for comment in earlier] if fingerprinted else None,
+    )
+
+
+def test_transformer_refreshes_from_the_cached_perspective_and_only_new_comments() -> None:
+    item = refreshable_item()
+    cached = item.ai_perspective
+    generator = RefreshingPerspectiveGenerator()
+
+    [transformed] = asyncio.run(Transformer(generator).transform(items=[item]))
+
+    [(perspective, new_comments, previous_count)] = generator.refresh_calls
+    assert perspective == cached
+    assert [comment.author for comment in new_comments] == [f"late-{index}" for index in range(16)]
+    assert previous_count == 15
+    assert generator.calls == []
+    assert transformed.ai_perspective.summary == "Updated with new comments."
+    assert transformed.generated_at_comment_count == 30
+    assert transformed.generated_from_comments == [comment_fingerprint(comment) for comment in item.comments]
+
+
+def test_transformer_regenerates_in_full_when_incremental_refresh_is_unavailable() -> None:
+    failing = RefreshingPerspectiveGenerator(refresh_fails=True)
+    unfingerprinted = RefreshingPerspectiveGenerator()
+    disabled = RefreshingPerspectiveGenerator()
+
+    asyncio.run(Transformer(failing).transform(items=[refreshable_item()]))
+    asyncio.run(Transformer(unfingerprinted).transform(items=[refreshable_item(fingerprinted=False)]))
+    asyncio.run(Transformer(disabled, incremental_refresh=False).transform(items=[refreshable_item()]))
+
+    assert len(failing.refresh_calls) == 1
+    assert [len(comments) for _, comments in failing.calls] == [30]
+    assert (unfingerprinted.refresh_calls, len(unfingerprinted.calls)) == ([], 1)
+    assert (disabled.refresh_calls, len(disabled.calls)) == ([], 1)
+
+
+class BatchingPerspectiveGenerator(FakePerspectiveGenerator):
+    def __init__(self, *, unanswered: set[str], failing_batch: str | None = None) -> None:
+        super().__init__()
+        self.batches: list[list[str]] = []
+        self._unanswered = unanswered
+        self._failing_batch = failing_batch
+
+    async def generate_batch(self, discussions: dict[str, tuple[str, list[Comment]]]) -> dict[str, Perspective]:
+        self.batches.append(list(discussions))
+        if self._failing_batch in discussions:
+            raise PerspectiveGenerationError("provider unavailable")
+        return {
+            item_id: Perspective(title=f"Batched {title}", summary="s", sentiment="mixed", viewpoints=[])
+            for item_id, (title, _) in discussions.items()
+            if item_id not in self._unanswered
+        }
+
+
+def test_transformer_batches_small_new_items_and_retries_unanswered_ones_alone() -> None:
+    now = datetime(2026, 7, 21, tzinfo=UTC)
+
+    def discussion(item_id: str, comment_count: int, *, cached: bool = False) -> Item:
+        return Item(
+            id=item_id,
+            title=f"Item {item_id}",
+            url=f"https://example.test/{item_id}",
+            comments=[Comment(author=f"reader-{index}", content=f"comment-{index}") for index in range(comment_count)],
+            created_at=now,
+            updated_at=now,
+            ai_perspective=Perspective(title="Cached", summary="s", sentiment="mixed", viewpoints=[])
+            if cached
+            else None,
+            generated_at_comment_count=comment_count if cached else None,
+        )
+
+    items = [
+        discussion("a", 15),
+        discussion("b", 20),
+        discussion("large", 80),
+        discussion("c", 16),
+        discussion("cached", 15, cached=True),
+        discussion("d", 30),
+        discussion("e", 17),
+        discussion("few", 3),
+    ]
+    generator = BatchingPerspectiveGenerator(unanswered={"b"}, failing_batch="d")
+
+    transformed = asyncio.run(Transformer(generator, batch_size=2).transform(items=items))
+
+    # "e" would be a batch of one, so it goes through the single-Item path directly.
+    assert generator.batches == [["a", "b"], ["c", "d"]]
+    assert sorted(title for title, _ in generator.calls) == ["Item b", "Item c", "Item d", "Item e", "Item large"]
+    assert [item.ai_perspective.title if item.ai_perspective else None for item in transformed] == [
+        "Batched Item a",
+        "Offline result",
+        "Offline result",
+        "Offline result",
+        "Cached",
+        "Offline result",
+        "Offline result",
+        None,
+    ]
+    assert transformed[0].generated_at_comment_count == 15
@@ -0,0 +1,24 @@
+from urls import normalize_url
+
+
+def test_resubmitted_urls_normalise_to_one_key() -> None:
+    variants = [
+        "https://example.test/posts/launch",
+        "http://www.Example.test/posts/launch/",
+        "https://example.test/posts/launch#comments",
+        "https://example.test:443/posts/launch?utm_source=hn&utm_medium=social",
+        "https://example.test/posts/launch?fbclid=abc",
+    ]
+
+    assert {normalize_url(url) for url in variants} == {"https://example.test/posts/launch"}
+
+
+def test_meaningful_url_parts_are_kept() -> None:
+    assert normalize_url("https://example.test/search?q=rust&page=2") == "https://example.test/search?page=2&q=rust"
+    assert normalize_url("https://example.test:8080/Docs/") == "https://example.test:8080/Docs"
+    assert normalize_url("https://example.test") == "https://example.test/"
+
+
+def test_unparseable_urls_normalise_to_themselves() -> None:
+    assert normalize_url(" http://[bad/ ") == "http://[bad/"
+    assert normalize_url("https://example.test:99999/") == "https://example.test:99999/"
@@ -1,22 +1,119 @@
+import asyncio
+import time
+from collections.abc import Awaitable, Callable
+from itertools import batched
+
 from loguru import logger
-from models import Item
+from models import Item, Perspective
 from perspective_generator import (
     MIN_COMMENTS_FOR_PERSPECTIVE,
+    GeneratesBatches,
     PerspectiveGenerationError,
     PerspectiveGenerator,
+    RefreshesPerspective,
+    WaitsForRateLimit,
+    comment_fingerprint,
     needs_refresh,
 )
 
 
+class TokenBucket:
+    def __init__(
+        self,
+        requests_per_minute: float,
+        *,
+        burst: int = 1,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if requests_per_minute <= 0:
+            raise ValueError("requests_per_minute must be positive")
+        if burst < 1:
+            raise ValueError("burst must be at least 1")
+        self._interval = 60 / requests_per_minute
+        self._burst = burst
+        self._clock = clock
+        self._tokens = float(burst)
+        self._refilled_at = clock()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        # Waiters queue on the lock, so requests are released in arrival order and never in a burst after a wait.
+        async with self._lock:
+            while True:
+                now = self._clock()
+                self._tokens = min(self._burst, self._tokens + (now - self._refilled_at) / self._interval)
+                self._refilled_at = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) * self._interval)
+
+
 class Transformer:
-    def __init__(self, perspective_generator: PerspectiveGenerator) -> None:
+    def __init__(
+        self,
+        perspective_generator: PerspectiveGenerator,
+        *,
+        concurrency: int = 4,
+        requests_per_minute: float | None = None,
+        incremental_refresh: bool = True,
+        batch_size: int = 1,
+        batch_max_comments: int = 2 * MIN_COMMENTS_FOR_PERSPECTIVE,
+    ) -> None:
+        if concurrency < 1:
+            raise ValueError("concurrency must be at least 1")
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+        self._concurrency = concurrency
+        self._incremental_refresh = incremental_refresh
+        self._batch_size = batch_size
+        self._batch_max_comments = batch_max_comments
+        self._rate_limit = TokenBucket(requests_per_minute) if requests_per_minute is not None else None
+        # A generator that takes the bucket waits for it only when it calls the provider, so cache hits never queue.
+        if self._rate_limit is not None and isinstance(perspective_generator, WaitsForRateLimit):
+            perspective_generator = perspective_generator.with_rate_limit(self._rate_limit.acquire)
+            self._rate_limit = None
         self._perspective_generator = perspective_generator
 
     async def transform(self, items: list[Item]) -> list[Item]:
-        for item in items:
-            await self._transform_item(item)
+        semaphore = asyncio.Semaphore(self._concurrency)
+
+        async def limited(work: Awaitable[None]) -> None:
+            async with semaphore:
+                await work
+
+        # Small new Items share requests first; any the batch did not answer still lack a Perspective and are
+        # generated one by one below, with the usual skip and failure handling.
+        generator = self._perspective_generator
+        if self._batch_size > 1 and isinstance(generator, GeneratesBatches):
+            batches = [list(chunk) for chunk in batched(self._batchable(items), self._batch_size) if len(chunk) > 1]
+            await asyncio.gather(*(limited(self._transform_batch(generator, batch)) for batch in batches))
+
+        # Items are updated in place, so the returned list keeps the input order whatever order generations finish in.
+        await asyncio.gather(*(limited(self._transform_item(item)) for item in items))
         return items
 
+    def _batchable(self, items: list[Item]) -> list[Item]:
+        return [
+            item
+            for item in items
+            if item.ai_perspective is None
+            and MIN_COMMENTS_FOR_PERSPECTIVE <= len(item.comments) <= self._batch_max_comments
+        ]
+
+    async def _transform_batch(self, generator: GeneratesBatches, items: list[Item]) -> None:
+        await self._acquire_rate_limit()
+        try:
+            perspectives = await generator.generate_batch({item.id: (item.title, item.comments) for item in items})
+        except PerspectiveGenerationError:
+            logger.warning("Batched request for {} Items failed; generating them one by one", len(items))
+            return
+        for item in items:
+            if (perspective := perspectives.get(item.id)) is not None:
+                self._apply(item, perspective)
+            else:
+                logger.info("No usable Perspective for {!r} from the batched request; generating it alone", item.title)
+
     async def _transform_item(self, item: Item) -> None:
         refreshing = item.ai_perspective is not None and needs_refresh(item)
         if refreshing:
@@ -39,10 +136,49 @@ class Transformer:
             )
             return
 
-        try:
-            perspective = await self._perspective_generator.generate(title=item.title, comments=item.comments)
-        except PerspectiveGenerationError:
-            logger.exception("Skipping Perspective for {!r}: generation failed", item.title)
-            return
+        perspective = await self._refresh_incrementally(item) if refreshing else None
+        if perspective is None:
+            await self._acquire_rate_limit()
+            try:
+                perspective = await self._perspective_generator.generate(title=item.title, comments=item.comments)
+            except PerspectiveGenerationError:
+                logger.exception("Skipping Perspective for {!r}: generation failed", item.title)
+                return
+        self._apply(item, perspective)
+
+    def _apply(self, item: Item, perspective: Perspective) -> None:
         item.ai_perspective = perspective
         item.generated_at_comment_count = len(item.comments)
+        item.generated_from_comments = [comment_fingerprint(comment) for comment in item.comments]
+
+    async def _refresh_incrementally(self, item: Item) -> Perspective | None:
+        # Perspectives stored before comment fingerprints were kept have no baseline and are regenerated in full.
+        generator = self._perspective_generator
+        if (
+            not self._incremental_refresh
+            or not isinstance(generator, RefreshesPerspective)
+            or item.ai_perspective is None
+            or item.generated_at_comment_count is None
+            or item.generated_from_comments is None
+        ):
+            return None
+        known = set(item.generated_from_comments)
+        new_comments = [comment for comment in item.comments if comment_fingerprint(comment) not in known]
+        if not new_comments:
+            return None
+
+        await self._acquire_rate_limit()
+        try:
+            return await generator.refresh(
+                title=item.title,
+                perspective=item.ai_perspective,
+                new_comments=new_comments,
+                previous_comment_count=item.generated_at_comment_count,
+            )
+        except PerspectiveGenerationError:
+            logger.warning("Incremental refresh failed for {!r}; regenerating from all comments", item.title)
+            return None
+
+    async def _acquire_rate_limit(self) -> None:
+        if self._rate_limit is not None:
+            await self._rate_limit.acquire()
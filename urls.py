@@ -0,0 +1,24 @@
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+TRACKING_PARAMETERS = frozenset({"fbclid", "gclid", "mc_cid", "mc_eid", "ref_src"})
+
+
+def normalize_url(url: str) -> str:
+    # Resubmissions of one article differ in scheme, www., trailing slashes, fragments and tracking parameters.
+    try:
+        parts = urlsplit(url.strip())
+        host = (parts.hostname or "").removeprefix("www.")
+        if parts.port and parts.port not in (80, 443):
+            host = f"{host}:{parts.port}"
+    except ValueError:
+        # Unparseable URLs such as "http://[bad/" or an out-of-range port can only match themselves.
+        return url.strip()
+    path = parts.path.rstrip("/") or "/"
+    query = urlencode(
+        sorted(
+            (key, value)
+            for key, value in parse_qsl(parts.query, keep_blank_values=True)
+            if not key.lower().startswith("utm_") and key.lower() not in TRACKING_PARAMETERS
+        )
+    )
+    return urlunsplit(("https" if parts.scheme in ("http", "https") else parts.scheme, host, path, query, ""))